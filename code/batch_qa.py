@@ -0,0 +1,206 @@
+import os
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from rag_pipeline.context_assembler import ContextAssembler
+from rag_pipeline.llm import answer_question, LLM_MAX_CONCURRENCY
+from core.bulk_embedding import EMBED_CHARS_PER_TOKEN
+from core.concurrency import ConcurrencyLimiter
+
+OUTPUT_FILE = "./data/batch_answers.jsonl"
+RETRIEVE_BATCH_SIZE = 256
+# USD per 1M tokens (gemini-2.5-pro up to 200k prompt tokens, gemini-embedding-001); override when prices change
+LLM_INPUT_PRICE_PER_M = float(os.getenv("LLM_INPUT_PRICE_PER_M", "1.25"))
+LLM_OUTPUT_PRICE_PER_M = float(os.getenv("LLM_OUTPUT_PRICE_PER_M", "10.0"))
+EMBED_PRICE_PER_M = float(os.getenv("EMBED_PRICE_PER_M", "0.15"))
+
+
+def read_questions(path):
+    """
+    კითხვები JSONL (ერთი ობიექტი ხაზზე) ან CSV ფაილიდან. აუცილებელია question ველი/სვეტი; id არასავალდებულოა
+    და მისი არარსებობისას გამოიყენება ხაზის ნომერი. ცარიელი კითხვები გამოტოვებულია.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (orjson.loads(line) for line in f if line.strip())
+        for number, row in enumerate(rows, start=1):
+            question = (row.get("question") or "").strip()
+            if question:
+                yield {"id": str(row.get("id") or number), "question": question}
+
+
+def load_checkpoint(path, mode="answer"):
+    """
+    უკვე შედეგში ჩაწერილი (შეცდომის გარეშე) კითხვების id-ები იმავე რეჟიმისთვის (mode: "answer" ან "retrieve");
+    ხელახალი გაშვება მხოლოდ დანარჩენებს ამუშავებს. --retrieve-only ჩანაწერები სრულ გაშვებაში დასრულებულად არ ითვლება.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # A run killed mid-write leaves a truncated last line
+                continue
+            record_mode = record.get("mode") or ("answer" if "answer" in record else "retrieve")
+            if record.get("error") is None and record_mode == mode and (mode != "answer" or "answer" in record):
+                done.add(record["id"])
+    return done
+
+
+class BatchRunner:
+    """
+    ოფლაინ Q&A batch რეჟიმში: კითხვები იძებნება batch_size ზომის ჯგუფებად HybridRAG.retrieve_many_hits-ით (ერთი batch
+    ემბედინგის მოთხოვნა და ერთი Chroma query თითო ჯგუფზე), კონტექსტი აიწყობა ContextAssembler-ით, პასუხები კი
+    გენერირდება answer_question-ით concurrency ნაკადში. მომდევნო ჯგუფის ძიება წინა ჯგუფის პასუხების გენერაციას ემთხვევა.
+    შედეგები იწერება JSONL-ში დასრულებისთანავე, რაც checkpoint-ის როლსაც ასრულებს.
+    LLM გამოძახებები საკუთარ, concurrency ზომის ლიმიტს ექვემდებარება და არა ჩატის LLM_MAX_CONCURRENCY-ს.
+    """
+
+    def __init__(self, rag, assembler=None, concurrency=None, batch_size=RETRIEVE_BATCH_SIZE, retrieve_only=False):
+        self.rag = rag
+        self.assembler = assembler or ContextAssembler()
+        self.concurrency = concurrency or LLM_MAX_CONCURRENCY
+        self.limiter = ConcurrencyLimiter("batch_llm", self.concurrency)
+        self.batch_size = batch_size
+        self.retrieve_only = retrieve_only
+        self.mode = "retrieve" if retrieve_only else "answer"
+
+    def _answer(self, item, assembled):
+        record = {
+            "id": item["id"],
+            "question": item["question"],
+            "mode": self.mode,
+            "article_ids": assembled.article_numbers(),
+            "chunk_ids": assembled.chunk_ids,
+            "context_tokens": assembled.tokens,
+        }
+        if self.retrieve_only:
+            return record
+        stats = {}
+        try:
+            record["answer"] = answer_question(item["question"], assembled.text, stats, limiter=self.limiter)
+        except Exception as e:
+            record["error"] = str(e)
+        record["stats"] = stats
+        return record
+
+    def run(self, items, output_path=OUTPUT_FILE):
+        done = load_checkpoint(output_path, self.mode)
+        items = [item for item in items if item["id"] not in done]
+        report = {
+            "questions": len(items) + len(done),
+            "skipped_from_checkpoint": len(done),
+            "answered": 0,
+            "failed": 0,
+            # Answers shared with an identical in-flight generation (no separate LLM call or tokens)
+            "coalesced": 0,
+        }
+        stages = {"retrieve_s": 0.0, "assemble_s": 0.0, "llm_s": 0.0}
+        tokens = {"embedded_estimate": 0, "prompt": 0, "output": 0}
+        print(f"🔄 {len(items)} questions to process ({len(done)} already in {output_path})")
+
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        started = time.perf_counter()
+
+        def write(futures):
+            for future in futures:
+                record = future.result()
+                out.write(orjson.dumps(record) + b"\n")
+                if record.get("error") is not None:
+                    report["failed"] += 1
+                    continue
+                report["answered"] += 1
+                stats = record.get("stats", {})
+                report["coalesced"] += bool(stats.get("coalesced"))
+                stages["llm_s"] += stats.get("total_time", 0.0)
+                tokens["prompt"] += stats.get("prompt_tokens") or 0
+                tokens["output"] += stats.get("output_tokens") or 0
+            out.flush()
+
+        with open(output_path, "ab") as out, ThreadPoolExecutor(self.concurrency, thread_name_prefix="batch-qa") as pool:
+            previous = []
+            try:
+                for i in range(0, len(items), self.batch_size):
+                    batch = items[i:i + self.batch_size]
+                    questions = [item["question"] for item in batch]
+
+                    start = time.perf_counter()
+                    hits_per_question = self.rag.retrieve_many_hits(questions)
+                    stages["retrieve_s"] += time.perf_counter() - start
+                    tokens["embedded_estimate"] += round(sum(len(q) for q in questions) / EMBED_CHARS_PER_TOKEN)
+
+                    start = time.perf_counter()
+                    assembled = [self.assembler.assemble(hits) for hits in hits_per_question]
+                    stages["assemble_s"] += time.perf_counter() - start
+
+                    current = [pool.submit(self._answer, item, context) for item, context in zip(batch, assembled)]
+                    # At most two batches are in flight: this one is generating while the next one is retrieved
+                    write(previous)
+                    previous = current
+                    print(f"🔄 Processed {min(i + self.batch_size, len(items))}/{len(items)} questions")
+            finally:
+                # Answers already paid for are written even if a later retrieval fails
+                write(previous)
+
+        seconds = time.perf_counter() - started
+        cost = {
+            "embedding": tokens["embedded_estimate"] * EMBED_PRICE_PER_M / 1e6,
+            "llm_input": tokens["prompt"] * LLM_INPUT_PRICE_PER_M / 1e6,
+            "llm_output": tokens["output"] * LLM_OUTPUT_PRICE_PER_M / 1e6,
+        }
+        cost["total"] = sum(cost.values())
+        report.update({
+            "seconds": round(seconds, 2),
+            "questions_per_s": round(len(items) / seconds, 2) if seconds else 0.0,
+            "stages": {name: round(value, 2) for name, value in stages.items()},
+            "tokens": tokens,
+            "cost_usd": {name: round(value, 4) for name, value in cost.items()},
+        })
+        return report
+
+
+def main():
+    """
+    კითხვების მასობრივი დამუშავება იმავე პაიპლაინით, რასაც main.py იყენებს, პროექტის მთავარი დირექტორიიდან:
+    python code/batch_qa.py questions.jsonl --output data/batch_answers.jsonl --concurrency 8
+    შეწყვეტის შემთხვევაში იგივე ბრძანება აგრძელებს დაუმთავრებელი და შეცდომით დასრულებული კითხვებიდან.
+    """
+    parser = argparse.ArgumentParser(description="Answer a file of questions through the civil code RAG pipeline")
+    parser.add_argument("input", help="JSONL or CSV file with a question field and an optional id")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--concurrency", type=int, default=LLM_MAX_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=RETRIEVE_BATCH_SIZE, help="questions per retrieval batch")
+    parser.add_argument("--retrieve-only", action="store_true", help="record retrieved articles without calling the LLM")
+    parser.add_argument("--local-embeddings", action="store_true",
+                        help="use the offline hashing embedding stand-in instead of Gemini")
+    parser.add_argument("--report", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    from service import build_rag
+    rag = build_rag(args.local_embeddings)
+    runner = BatchRunner(rag, concurrency=args.concurrency, batch_size=args.batch_size, retrieve_only=args.retrieve_only)
+    report = runner.run(read_questions(args.input), args.output)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ Answered {report['answered']} questions ({report['failed']} failed) in {report['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
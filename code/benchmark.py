@@ -0,0 +1,314 @@
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import resource
+import tempfile
+import tracemalloc
+import numpy as np
+import chromadb
+from core.local_embeddings import HashingEmbeddingFunction
+from processing.data_processing import build_chunks, DOCX_FILE
+# vector_store reports its SQLite shim on import; keep stdout for the JSON report
+with contextlib.redirect_stdout(sys.stderr):
+    from rag_pipeline.vector_store import load_data, QuantizedVectorStore
+from rag_pipeline.hybrid_rag import HybridRAG
+from rag_pipeline.fusion import FUSION_MODES
+
+GOLD_FILE = "./data/gold_questions.json"
+
+
+def _timed(fn, samples):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+class _TimedEmbedding:
+    """ემბედინგის ფუნქციის გარსი, რომელიც ყოველი გამოძახების ხანგრძლივობას იწერს."""
+
+    def __init__(self, model, samples):
+        self._model = model
+        self._call = _timed(model, samples)
+
+    def __call__(self, input):
+        return self._call(input)
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+class _TimedCollection:
+    """Chroma კოლექციის გარსი, რომელიც query გამოძახებების ხანგრძლივობას იწერს."""
+
+    def __init__(self, collection, samples):
+        self._collection = collection
+        self.query = _timed(collection.query, samples)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+def _max_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (2**20 if sys.platform == "darwin" else 1024), 2)
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    ms = np.asarray(samples) * 1000
+    return {
+        "count": len(samples),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+    }
+
+
+def _quality(results, gold, article_of, k):
+    recalls, reciprocal_ranks, hits = [], [], []
+    for docs, item in zip(results, gold):
+        expected = set(item["articles"])
+        found = list(dict.fromkeys(article_of.get(doc) for doc in docs[:k]))
+        recalls.append(len(expected.intersection(found)) / len(expected))
+        rank = next((i + 1 for i, article in enumerate(found) if article in expected), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        hits.append(1.0 if rank else 0.0)
+    return {
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+        f"mrr@{k}": round(float(np.mean(reciprocal_ranks)), 4),
+        f"hit@{k}": round(float(np.mean(hits)), 4),
+    }
+
+
+def run_benchmark(docx_file=DOCX_FILE, gold_file=GOLD_FILE, repeat=5, top_k=5, dim=768, fusion="rerank"):
+    """
+    აგებს სრულ პაიპლაინს DOCX-დან ლოკალური HashingEmbeddingFunction-ითა და დროებითი (ephemeral) Chroma კლიენტით,
+    გაუშვებს ოქროს სტანდარტის შეკითხვებს და აბრუნებს ანგარიშს: აგების დრო, თითოეული ეტაპის ლატენტობის პერცენტილები,
+    queries/sec, მეხსიერების პიკი და recall@k/MRR. ქსელთან კავშირი არ სჭირდება.
+    fusion — dense/sparse შედეგების გაერთიანების რეჟიმი ("rerank", "rrf" ან "weighted").
+    """
+
+    with open(gold_file, "r", encoding="utf-8") as f:
+        gold = json.load(f)
+    questions = [item["question"] for item in gold]
+    embedding_model = HashingEmbeddingFunction(dim=dim)
+    report = {"config": {"docx": docx_file, "questions": len(gold), "repeat": repeat, "top_k": top_k, "dim": dim,
+                         "fusion": fusion}}
+
+    build = {}
+    start = time.perf_counter()
+    chunks = build_chunks(docx_file)
+    build["chunking_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    collection = load_data(chunks, client=chromadb.EphemeralClient(), embedding_function=embedding_model)
+    build["collection_s"] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        start = time.perf_counter()
+        HybridRAG(collection, chunks, top_k=top_k, embedding_model=embedding_model, index_dir=index_dir, fusion=fusion)
+        build["index_cold_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rag = HybridRAG(collection, chunks, top_k=top_k, embedding_model=embedding_model, index_dir=index_dir,
+                        fusion=fusion)
+        build["index_warm_s"] = time.perf_counter() - start
+
+        build_rss = _max_rss_mb()
+        report["build"] = {key: round(value, 3) for key, value in build.items()}
+        report["build"]["chunks"] = len(chunks)
+
+        stages = {"embed": [], "dense": [], "sparse": [], "rerank": [], "retrieve": []}
+        rag.embedding_model = _TimedEmbedding(rag.embedding_model, stages["embed"])
+        rag.collection = _TimedCollection(rag.collection, stages["dense"])
+        rag.sparse.search_scored = _timed(rag.sparse.search_scored, stages["sparse"])
+        rag.reranker.rerank = _timed(rag.reranker.rerank, stages["rerank"])
+        retrieve = _timed(rag.retrieve, stages["retrieve"])
+
+        rag.retrieve_many(questions[:2])  # warm-up
+        for stage in stages.values():
+            stage.clear()
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            results = [retrieve(question) for question in questions]
+        sequential_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            rag.retrieve_many(questions)
+        batched_s = time.perf_counter() - start
+
+        report["latency"] = {name: _percentiles(samples) for name, samples in stages.items()}
+        report["throughput"] = {
+            "sequential_qps": round(len(questions) * repeat / sequential_s, 2),
+            "batched_qps": round(len(questions) * repeat / batched_s, 2),
+        }
+
+        # Query memory is measured in a separate pass because tracemalloc distorts timings
+        tracemalloc.start()
+        for question in questions:
+            rag.retrieve(question)
+        _, query_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    report["memory"] = {
+        "max_rss_after_build_mb": build_rss,
+        "query_peak_mb": round(query_peak / 2**20, 2),
+        "max_rss_mb": _max_rss_mb(),
+    }
+
+    article_of = {chunk['text']: chunk['metadata']['article_number'] for chunk in chunks}
+    report["quality"] = _quality(results, gold, article_of, top_k)
+    return report
+
+
+# Quantized backend configurations compared against Chroma in the vector backend report
+BACKEND_CONFIGS = [
+    {"name": "float32", "dtype": "float32"},
+    {"name": "float16", "dtype": "float16"},
+    {"name": "int8", "dtype": "int8"},
+    {"name": "int8_half_dims", "dtype": "int8", "dims_ratio": 0.5},
+    {"name": "int8_half_dims_rescore", "dtype": "int8", "dims_ratio": 0.5, "rescore": True},
+    {"name": "int8_ivf", "dtype": "int8", "ivf": True},
+]
+
+
+def _directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def _overlap_recall(found, expected):
+    return float(np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(found, expected) if b]))
+
+
+def run_backend_report(docx_file=DOCX_FILE, gold_file=GOLD_FILE, top_k=5, dim=768, n_results=10, sample_queries=200,
+                       fusion="rerank"):
+    """
+    ადარებს Chroma-სა და QuantizedVectorStore-ის კონფიგურაციებს: ვექტორული ინდექსის მეხსიერება (Chroma-სთვის — დისკზე
+    დაკავებული ზომა), dense query-ს ლატენტობა, recall@n_results ზუსტ float32 ძიებასთან შედარებით, ოქროს სტანდარტის
+    ხარისხი მხოლოდ საცავის dense ძიებით (dense_quality) და მთლიან HybridRAG პაიპლაინში (pipeline_quality).
+    reranker ყოველთვის სრული სიზუსტის ვექტორებით იგება, ამიტომ pipeline_quality საცავზე მხოლოდ კანდიდატების მეშვეობით
+    არის დამოკიდებული. HashingEmbeddingFunction Matryoshka მოდელი არ არის,
+    ამიტომ შემოკლებული განზომილებების შედეგები აქ უფრო ცუდია, ვიდრე gemini-embedding-001-ით იქნებოდა.
+    """
+    with open(gold_file, "r", encoding="utf-8") as f:
+        gold = json.load(f)
+    chunks = build_chunks(docx_file)
+    embedding_model = HashingEmbeddingFunction(dim=dim)
+    article_of = {chunk['text']: chunk['metadata']['article_number'] for chunk in chunks}
+
+    rng = np.random.default_rng(0)
+    sampled = rng.choice(len(chunks), size=min(sample_queries, len(chunks)), replace=False)
+    queries = [item["question"] for item in gold] + [chunks[i]['metadata']['article_title'] for i in sampled]
+    query_embs = embedding_model(queries)
+    gold_embs = query_embs[:len(gold)]
+
+    report = {"config": {"chunks": len(chunks), "dim": dim, "queries": len(queries), "n_results": n_results,
+                         "fusion": fusion}}
+    with tempfile.TemporaryDirectory() as tmp:
+        chroma_path = os.path.join(tmp, "chroma")
+        collection = load_data(chunks, client=chromadb.PersistentClient(path=chroma_path),
+                               embedding_function=embedding_model)
+        order = [chunk['id'] for chunk in chunks]
+        exact = QuantizedVectorStore.from_collection(collection, order=order, dtype="float32")
+        expected = [exact.query([emb], n_results, include=())["ids"][0] for emb in query_embs]
+
+        backends = {"chroma": collection}
+        for config in BACKEND_CONFIGS:
+            dims = int(dim * config.get("dims_ratio", 1.0))
+            backends[config["name"]] = QuantizedVectorStore.from_collection(
+                collection, order=order, dtype=config["dtype"], dims=dims,
+                n_lists=int(np.sqrt(len(chunks))) if config.get("ivf") else 0,
+                full_vectors=exact.codes if config.get("rescore") else None, full_vector_ids=exact.ids,
+            )
+
+        for name, backend in backends.items():
+            # Own sparse index and rerank matrix per backend, so the pipeline numbers come from this store
+            index_dir = os.path.join(tmp, "index", name)
+            samples = []
+            query = _timed(backend.query, samples)
+            found = [query(query_embeddings=[emb], n_results=n_results, include=["distances"])["ids"][0]
+                     for emb in query_embs]
+            dense = [backend.query(query_embeddings=[emb], n_results=top_k, include=["documents"])["documents"][0]
+                     for emb in gold_embs]
+            rag = HybridRAG(backend, chunks, top_k=top_k, embedding_model=embedding_model, index_dir=index_dir,
+                            fusion=fusion)
+            results = [rag.retrieve(item["question"]) for item in gold]
+            report[name] = {
+                "index_mb": round((_directory_bytes(chroma_path) if name == "chroma" else backend.nbytes) / 2**20, 3),
+                "query_latency": _percentiles(samples),
+                f"recall@{n_results}_vs_exact": round(_overlap_recall(found, expected), 4),
+                "dense_quality": _quality(dense, gold, article_of, top_k),
+                "pipeline_quality": _quality(results, gold, article_of, top_k),
+            }
+    return report
+
+
+def check_thresholds(report, min_recall=None, min_mrr=None, max_p95_ms=None):
+    """აბრუნებს დარღვეული ზღვრების სიას; ცარიელი სია ნიშნავს, რომ რეგრესია არ დაფიქსირდა."""
+    failures = []
+    top_k = report["config"]["top_k"]
+    if min_recall is not None and report["quality"][f"recall@{top_k}"] < min_recall:
+        failures.append(f"recall@{top_k} {report['quality'][f'recall@{top_k}']} < {min_recall}")
+    if min_mrr is not None and report["quality"][f"mrr@{top_k}"] < min_mrr:
+        failures.append(f"mrr@{top_k} {report['quality'][f'mrr@{top_k}']} < {min_mrr}")
+    if max_p95_ms is not None and report["latency"]["retrieve"]["p95_ms"] > max_p95_ms:
+        failures.append(f"retrieve p95 {report['latency']['retrieve']['p95_ms']}ms > {max_p95_ms}ms")
+    return failures
+
+
+def main():
+    """
+    ოფლაინ ბენჩმარკის გაშვება პროექტის მთავარი დირექტორიიდან: python code/benchmark.py
+    ზღვრების (--min-recall, --min-mrr, --max-p95-ms) დარღვევისას სკრიპტი არანულოვანი კოდით სრულდება.
+    """
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark for the civil code RAG pipeline")
+    parser.add_argument("--docx", default=DOCX_FILE)
+    parser.add_argument("--gold", default=GOLD_FILE)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--min-recall", type=float)
+    parser.add_argument("--min-mrr", type=float)
+    parser.add_argument("--max-p95-ms", type=float)
+    parser.add_argument("--backend-report", action="store_true",
+                        help="compare Chroma with the quantized in-process vector backends instead")
+    parser.add_argument("--fusion", choices=FUSION_MODES, default="rerank",
+                        help="how dense and sparse results are combined")
+    args = parser.parse_args()
+
+    # Progress messages from the pipeline go to stderr, so stdout carries only the JSON report (e.g. for | jq)
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.backend_report:
+            report = run_backend_report(args.docx, args.gold, top_k=args.top_k, dim=args.dim, fusion=args.fusion)
+        else:
+            report = run_benchmark(args.docx, args.gold, repeat=args.repeat, top_k=args.top_k, dim=args.dim,
+                                   fusion=args.fusion)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.backend_report:
+        return
+
+    failures = check_thresholds(report, args.min_recall, args.min_mrr, args.max_p95_ms)
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
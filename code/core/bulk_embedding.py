@@ -0,0 +1,216 @@
+import os
+import re
+import time
+import random
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from core.tracing import span, count
+
+try:
+    import httpx
+    # Timeouts, dropped connections and broken responses; a bad URL scheme or a malformed request is permanent
+    RETRYABLE_TRANSPORT_ERRORS = (httpx.TransportError,)
+    PERMANENT_TRANSPORT_ERRORS = (httpx.UnsupportedProtocol, httpx.LocalProtocolError)
+except ImportError:
+    RETRYABLE_TRANSPORT_ERRORS = ()
+    PERMANENT_TRANSPORT_ERRORS = ()
+
+# Gemini quotas are per minute; 0 disables the corresponding limit
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_REQUESTS_PER_MINUTE = float(os.getenv("EMBED_REQUESTS_PER_MINUTE", "150"))
+EMBED_TOKENS_PER_MINUTE = float(os.getenv("EMBED_TOKENS_PER_MINUTE", "0"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+EMBED_BACKOFF_BASE = 1.0
+EMBED_BACKOFF_MAX = 60.0
+# Rough token estimate for Georgian text, used only for the token rate limit
+EMBED_CHARS_PER_TOKEN = 2.5
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_STATUSES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL"}
+# "status 429", "code: 503", "HTTP 500"; a bare number elsewhere in the message is not a status
+STATUS_CODE_PATTERN = re.compile(r"\b(?:status(?:_code)?|code|HTTP)\b\W{0,3}(\d{3})\b", re.IGNORECASE)
+STATUS_NAME_PATTERN = re.compile(rf"\b(?:{'|'.join(sorted(RETRYABLE_STATUSES))})\b")
+
+
+class RateLimiter:
+    """
+    ნაკადებს შორის გაზიარებული token bucket: rate_per_minute ერთეული წუთში, მაქსიმუმ burst ერთეულის დაგროვებით.
+    მოთხოვნა, რომლის ღირებულება burst-ზე მეტია, სავსე bucket-ზე გაიცემა და ვალს ქმნის, რომელსაც მომდევნო მოთხოვნები ელოდება.
+    rate_per_minute=0 ლიმიტს თიშავს.
+    """
+
+    def __init__(self, rate_per_minute, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst or max(1.0, self.rate)
+        self._level = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def acquire(self, cost=1.0):
+        if self.rate <= 0:
+            return
+        needed = min(cost, self.capacity)
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._level >= needed:
+                    self._level -= cost
+                    return
+                wait = (needed - self._level) / self.rate
+                self.waited_seconds += wait
+            self._sleep(wait)
+
+
+def is_retryable(error):
+    """
+    429 (quota) და დროებითი 5xx/ქსელის შეცდომები ხელახლა ცდას ექვემდებარება; დანარჩენი (მაგ., 400) — არა.
+    ქსელის შეცდომებში შედის როგორც TimeoutError/ConnectionError, ისე httpx-ის ტრანსპორტის შეცდომები (ReadTimeout,
+    ConnectError, RemoteProtocolError), რომლებსაც google-genai კლიენტი აგდებს.
+    კლასიფიკაცია ხდება შეცდომის ტიპით ან მისი code/status/status_code ატრიბუტით; შეტყობინებაში მხოლოდ
+    „status“/„code“-ს მიმდევარი სტატუსის კოდი ან gRPC სტატუსის სახელი ითვლება და არა ნებისმიერი რიცხვი.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if isinstance(error, RETRYABLE_TRANSPORT_ERRORS):
+        return not isinstance(error, PERMANENT_TRANSPORT_ERRORS)
+    response = getattr(error, "response", None)
+    for status in (getattr(error, "code", None), getattr(error, "status_code", None),
+                   getattr(response, "status_code", None), getattr(error, "status", None)):
+        if isinstance(status, int):
+            return status in RETRYABLE_STATUS_CODES
+        if isinstance(status, str) and status:
+            return status in RETRYABLE_STATUSES
+    message = str(error)
+    match = STATUS_CODE_PATTERN.search(message)
+    if match:
+        return int(match.group(1)) in RETRYABLE_STATUS_CODES
+    return STATUS_NAME_PATTERN.search(message) is not None
+
+
+def backoff_delay(attempt, base=EMBED_BACKOFF_BASE, cap=EMBED_BACKOFF_MAX):
+    """ექსპონენციალური დაყოვნება „full jitter“-ით: შემთხვევითი მნიშვნელობა [0, min(cap, base·2^attempt)] შუალედიდან."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class BulkEmbedder:
+    """
+    ინჯესტიის დროს ტექსტების მასობრივი ემბედინგი GeminiEmbeddingFunction-ის მეშვეობით: batch-ები იგზავნება პარალელურად
+    (concurrency ნაკადით) მოთხოვნებისა და ტოკენების RateLimiter-ის ფარგლებში, 429/5xx შეცდომებზე კი მეორდება jitter-იანი
+    ექსპონენციალური დაყოვნებით. ყოველი დასრულებული batch მაშინვე იწერება ემბედინგების ქეშში (SQLite), რაც checkpoint-ის
+    როლს ასრულებს: შეწყვეტილი ინჯესტიის ხელახლა გაშვებისას უკვე ემბედდებული ტექსტები API-ში აღარ იგზავნება.
+    """
+
+    def __init__(self, embedding_function, concurrency=None, requests_per_minute=None, tokens_per_minute=None,
+                 max_retries=None, backoff_base=EMBED_BACKOFF_BASE, backoff_max=EMBED_BACKOFF_MAX, sleep=time.sleep):
+        self.embedding_function = embedding_function
+        self.concurrency = concurrency or EMBED_CONCURRENCY
+        self.request_limiter = RateLimiter(
+            EMBED_REQUESTS_PER_MINUTE if requests_per_minute is None else requests_per_minute, sleep=sleep
+        )
+        tokens_per_minute = EMBED_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute
+        # A whole minute of tokens may be spent at once: a single batch is often larger than a second's share
+        self.token_limiter = RateLimiter(tokens_per_minute, burst=tokens_per_minute or None, sleep=sleep)
+        self.max_retries = EMBED_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        self._stats_lock = threading.Lock()
+        self.last_report = None
+
+    def _estimate_tokens(self, texts):
+        return sum(len(text) for text in texts) / EMBED_CHARS_PER_TOKEN
+
+    def _embed_with_retry(self, texts, stats):
+        for attempt in range(self.max_retries + 1):
+            self.request_limiter.acquire()
+            self.token_limiter.acquire(self._estimate_tokens(texts))
+            try:
+                with span("embed.api", batch_size=len(texts), attempt=attempt):
+                    response = self.embedding_function._embed_batch(texts)
+                count("gemini_embed_calls")
+                count("gemini_embedded_texts", len(texts))
+                return [list(e.values) for e in response.embeddings]
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                count("gemini_embed_retries")
+                with self._stats_lock:
+                    stats["retries"] += 1
+                    stats["backoff_s"] += delay
+                self._sleep(delay)
+
+    def embed(self, texts):
+        """
+        აბრუნებს texts-ის ვექტორებს იმავე თანმიმდევრობით. ქეშში არსებული ტექსტები API-ში არ იგზავნება,
+        განმეორებული ტექსტები ერთხელ ემბედდება. ანგარიში (გამტარუნარიანობა, ხელახალი ცდები) ინახება last_report-ში.
+        """
+        function = self.embedding_function
+        cache = function.cache
+        start = time.perf_counter()
+        stats = {"retries": 0, "backoff_s": 0.0}
+
+        with span("embed.bulk", texts=len(texts)) as attrs:
+            keys = [cache.make_key(function.model, function.task_type, text) for text in texts]
+            resolved = cache.get_many(keys)
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in resolved:
+                    missing.setdefault(key, text)
+            missing_items = list(missing.items())
+            batches = [
+                missing_items[i:i + function.batch_size]
+                for i in range(0, len(missing_items), function.batch_size)
+            ]
+            attrs["batches"] = len(batches)
+
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bulk-embed") as executor:
+                futures = {
+                    executor.submit(
+                        contextvars.copy_context().run, self._embed_with_retry, [text for _, text in batch], stats
+                    ): batch
+                    for batch in batches
+                }
+                done = 0
+                error = None
+                for future in as_completed(futures):
+                    if future.cancelled():
+                        continue
+                    if future.exception() is not None:
+                        # Stop sending new batches, but keep checkpointing the ones already in flight
+                        if error is None:
+                            error = future.exception()
+                            for pending in futures:
+                                pending.cancel()
+                        continue
+                    batch = futures[future]
+                    fresh = {key: vector for (key, _), vector in zip(batch, future.result())}
+                    # Checkpoint: completed batches survive a crash of the remaining ones
+                    cache.put_many(fresh)
+                    resolved.update(fresh)
+                    done += 1
+                    if done % 10 == 0 or done == len(batches):
+                        print(f"🔄 Embedded {done}/{len(batches)} batches")
+                if error is not None:
+                    print(f"❌ Bulk embedding stopped after {done}/{len(batches)} batches; rerun to resume")
+                    raise error
+
+        seconds = time.perf_counter() - start
+        self.last_report = {
+            "texts": len(texts),
+            "cached": len(set(keys)) - len(missing),
+            "embedded": len(missing),
+            "batches": len(batches),
+            "retries": stats["retries"],
+            "backoff_s": round(stats["backoff_s"], 2),
+            "rate_limit_wait_s": round(self.request_limiter.waited_seconds + self.token_limiter.waited_seconds, 2),
+            "seconds": round(seconds, 2),
+            "texts_per_s": round(len(missing) / seconds, 2) if seconds else 0.0,
+        }
+        return [resolved[key] for key in keys]
@@ -0,0 +1,31 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_genai_client = None
+_genai_lock = threading.Lock()
+
+
+def get_api_key():
+    """Google API გასაღები გარემოს ცვლადიდან ან, მის არარსებობისას, Streamlit secrets-იდან."""
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        import streamlit as st
+        api_key = st.secrets["GOOGLE_API_KEY"]
+    return api_key
+
+
+def get_genai_client():
+    """
+    Gemini კლიენტი, რომელიც იქმნება პირველივე გამოყენებისას და არა მოდულის იმპორტისას,
+    რათა აპლიკაციის გაშვება და ოფლაინ ინსტრუმენტები API გასაღებსა და google-genai-ის ჩატვირთვაზე არ იყოს დამოკიდებული.
+    """
+    global _genai_client
+    if _genai_client is None:
+        with _genai_lock:
+            if _genai_client is None:
+                from google import genai
+                _genai_client = genai.Client(api_key=get_api_key())
+    return _genai_client
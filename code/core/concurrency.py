@@ -0,0 +1,221 @@
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from core.tracing import span, count, metrics
+
+
+class LeaderAbandoned(Exception):
+    """ლიდერმა სტრიმი ბოლომდე არ წაიკითხა (მაგ., მომხმარებელმა გვერდი დახურა); მომლოდინეები გამოთვლას თავად იწყებენ."""
+
+
+class SingleFlight:
+    """
+    ერთდროული იდენტური გამოძახებების გაერთიანება (single-flight): პირველი გამომძახებელი (ლიდერი) ასრულებს გამოთვლას,
+    იმავე გასაღებით მის დასრულებამდე შემოსული გამომძახებლები კი ელოდებიან და იღებენ იმავე შედეგს ან შეცდომას.
+    გასაღები იშლება გამოთვლის დასრულებისთანავე, ამიტომ ეს ქეში არ არის — მხოლოდ მიმდინარე გამოთვლებს აერთიანებს.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+
+    def do(self, key, fn, *args):
+        """აბრუნებს (result, shared) წყვილს; shared=True ნიშნავს, რომ შედეგი სხვა გამომძახებლის გამოთვლიდან იქნა აღებული."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            count(f"{self.name}_coalesced")
+            with span(f"{self.name}.coalesced_wait"):
+                return future.result(), True
+
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stream(self, key, make_stream, on_shared=None):
+        """
+        do-ს სტრიმინგის ვარიანტი: ლიდერი იტერირებს make_stream()-ს, მომლოდინეები კი იმავე ნაწილებს იღებენ მათი
+        გამოჩენისთანავე. თუ ლიდერი სტრიმს ბოლომდე არ კითხულობს (მაგ., მომხმარებელმა გვერდი დახურა), სტრიმის გაგრძელებას
+        ერთ-ერთი მომლოდინე იღებს თავის თავზე. on_shared გამოიძახება, როცა გამომძახებელი სხვის სტრიმს უერთდება.
+        """
+        with self._lock:
+            flight = self._streams.get(key)
+            leader = flight is None
+            if leader:
+                flight = _StreamFlight()
+                self._streams[key] = flight
+            else:
+                flight.followers += 1
+
+        if leader:
+            yield from self._lead(key, flight, iter(make_stream()))
+            return
+
+        count(f"{self.name}_coalesced")
+        if on_shared is not None:
+            on_shared()
+        adopted = None
+        try:
+            index = 0
+            while True:
+                pending, done = flight.wait(index)
+                for part in pending:
+                    yield part
+                index += len(pending)
+                if pending:
+                    continue
+                if done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                with self._lock:
+                    adopted = flight.adopt()
+                    if adopted is not None:
+                        flight.followers -= 1
+                if adopted is not None:
+                    # The leader went away mid-stream: carry on with its upstream iterator
+                    yield from self._lead(key, flight, adopted)
+                    return
+        finally:
+            if adopted is None:
+                with self._lock:
+                    flight.followers -= 1
+                    orphan = flight.adopt() if flight.followers == 0 else None
+                    if orphan is not None:
+                        self._streams.pop(key, None)
+                if orphan is not None:
+                    self._abandon(key, flight, orphan)
+
+    def _lead(self, key, flight, iterator):
+        finished = False
+        try:
+            for part in iterator:
+                flight.publish(part)
+                yield part
+            finished = True
+        except GeneratorExit:
+            with self._lock:
+                handed_off = flight.followers > 0
+                if handed_off:
+                    flight.hand_off(iterator)
+                else:
+                    self._streams.pop(key, None)
+            if not handed_off:
+                self._abandon(key, flight, iterator)
+            raise
+        except BaseException as e:
+            with self._lock:
+                self._streams.pop(key, None)
+            flight.fail(e)
+            raise
+        if finished:
+            with self._lock:
+                self._streams.pop(key, None)
+            flight.finish()
+
+    @staticmethod
+    def _abandon(key, flight, iterator):
+        flight.fail(LeaderAbandoned(key))
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+class _StreamFlight:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self.parts = []
+        self.done = False
+        self.error = None
+        # Guarded by SingleFlight._lock
+        self.followers = 0
+        self._orphan = None
+
+    def publish(self, part):
+        with self._condition:
+            self.parts.append(part)
+            self._condition.notify_all()
+
+    def finish(self):
+        with self._condition:
+            self.done = True
+            self._condition.notify_all()
+
+    def fail(self, error):
+        with self._condition:
+            self.error = error
+            self.done = True
+            self._condition.notify_all()
+
+    def hand_off(self, iterator):
+        with self._condition:
+            self._orphan = iterator
+            self._condition.notify_all()
+
+    def adopt(self):
+        with self._condition:
+            iterator, self._orphan = self._orphan, None
+            return iterator
+
+    def wait(self, index):
+        """ელოდება index-ის შემდეგ ახალ ნაწილებს, სტრიმის დასრულებას ან ლიდერის წასვლას; აბრუნებს (ნაწილები, done)."""
+        with self._condition:
+            while index == len(self.parts) and not self.done and self._orphan is None:
+                self._condition.wait()
+            return self.parts[index:], self.done
+
+
+class ConcurrencyLimiter:
+    """
+    პროცესის დონის ლიმიტი ერთდროულად შესრულებად ოპერაციებზე (მაგ., LLM გამოძახებები). ლიმიტს გადაცილებული გამომძახებლები
+    რიგში ელოდებიან; მეტრიკებში იწერება {name}_in_flight და {name}_queued gauge-ები და {name}.queue_wait ხანგრძლივობა.
+    limit=0 ლიმიტს თიშავს (მეტრიკები მაინც გროვდება).
+    """
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit) if limit > 0 else None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+
+    def _update(self, in_flight=0, queued=0):
+        with self._lock:
+            self.in_flight += in_flight
+            self.queued += queued
+            metrics.set_gauge(f"{self.name}_in_flight", self.in_flight)
+            metrics.set_gauge(f"{self.name}_queued", self.queued)
+
+    @contextmanager
+    def slot(self):
+        if self._semaphore is not None and not self._semaphore.acquire(blocking=False):
+            self._update(queued=1)
+            count(f"{self.name}_queued")
+            try:
+                with span(f"{self.name}.queue_wait"):
+                    self._semaphore.acquire()
+            finally:
+                self._update(queued=-1)
+        self._update(in_flight=1)
+        try:
+            yield
+        finally:
+            self._update(in_flight=-1)
+            if self._semaphore is not None:
+                self._semaphore.release()
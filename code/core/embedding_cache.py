@@ -0,0 +1,174 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+CACHE_FILE = os.getenv("EMBEDDING_CACHE_PATH", "./data/embedding_cache.sqlite3")
+
+
+class EmbeddingCache:
+    """
+    ემბედინგების ორდონიანი ქეში: პროცესის შიგნით LRU მეხსიერება და დისკზე შენახული SQLite საცავი,
+    რომელიც რესტარტის შემდეგაც რჩება. გასაღები არის (model, task_type, text)-ის SHA-256 ჰეში,
+    ამიტომ ერთი და იგივე ტექსტი ხელახლა აღარ იგზავნება Gemini API-ში.
+    ორივე დონეს აქვს ზომის ლიმიტი; დისკზე ყველაზე დიდი ხნის წინ გამოყენებული ჩანაწერები იშლება.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_memory_entries=10_000, max_disk_entries=500_000):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model: str, task_type: str, text: str) -> str:
+        payload = "\x1f".join((model, task_type or "", text)).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _connection(self):
+        # Opened lazily so that importing the module never touches the disk
+        if self._conn is None and self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key, vector):
+        if self.max_memory_entries <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """აბრუნებს ქეშში ნაპოვნ ვექტორებს {key: vector} სახით; ნაკლული გასაღებები უბრალოდ არ შედის შედეგში."""
+        found = {}
+        with self._lock:
+            pending = []
+            for key in dict.fromkeys(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                else:
+                    pending.append(key)
+            self.memory_hits += len(found)
+
+            conn = self._connection()
+            disk_found = 0
+            if pending and conn is not None:
+                now = time.time()
+                # SQLite limits the number of bound parameters per statement
+                for i in range(0, len(pending), 500):
+                    batch = pending[i:i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                        found[key] = vector
+                        self._remember(key, vector)
+                    if rows:
+                        conn.executemany(
+                            "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                            [(now, key) for key, _ in rows],
+                        )
+                    disk_found += len(rows)
+                conn.commit()
+
+            self.disk_hits += disk_found
+            self.misses += len(pending) - disk_found
+        return found
+
+    def put_many(self, items: dict[str, list[float]]):
+        """ინახავს ახალ ვექტორებს ორივე დონეზე და საჭიროების შემთხვევაში შლის ძველ ჩანაწერებს."""
+        if not items:
+            return
+        with self._lock:
+            for key, vector in items.items():
+                # Stored with the disk tier's float32 precision, so both tiers return identical vectors
+                self._remember(key, np.asarray(vector, dtype=np.float32).tolist())
+
+            conn = self._connection()
+            if conn is None:
+                return
+            now = time.time()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                [
+                    (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                    for key, vector in items.items()
+                ],
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        if not self.max_disk_entries:
+            return
+        (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            conn = self._connection()
+            if conn is not None:
+                conn.execute("DELETE FROM embeddings")
+                conn.commit()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> EmbeddingCache:
+    """პროცესის დონეზე გაზიარებული ქეში, რომელსაც ყველა GeminiEmbeddingFunction ინსტანცია იყენებს."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
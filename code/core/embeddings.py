@@ -1,24 +1,22 @@
-import os
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
-import streamlit as st
-
-load_dotenv()
-
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    api_key = st.secrets["GOOGLE_API_KEY"]
-genai_client = genai.Client(api_key=api_key)
+from core.clients import get_genai_client
+from core.embedding_cache import EmbeddingCache, get_default_cache
+from core.tracing import span, count
 
 class GeminiEmbeddingFunction:
     """
     Fully Chroma-compatible embedding function for Gemini embeddings.
+    Embeddings are served from an EmbeddingCache first; only cache misses are sent to the API.
     """
 
-    def __init__(self, model="gemini-embedding-001", batch_size=100):
+    def __init__(self, model="gemini-embedding-001", batch_size=100,
+                 task_type="SEMANTIC_SIMILARITY", cache: EmbeddingCache | None = None, client=None):
         self.model = model
         self.batch_size = batch_size
+        self.task_type = task_type
+        # Shared process-wide cache unless a dedicated one is passed in
+        self.cache = cache if cache is not None else get_default_cache()
+        # The Gemini client is only created when an embedding actually misses the cache
+        self._client = client
 
     # THIS MUST EXACTLY MATCH CHROMA INTERFACE
     def __call__(self, input: list[str]) -> list[list[float]]:
@@ -33,18 +31,45 @@ class GeminiEmbeddingFunction:
         embs = self._embed([input])
         return embs[0]
 
-    # Internal function that calls Gemini API
+    # Internal function that resolves cache hits and calls Gemini API for the misses
     def _embed(self, input: list[str]) -> list[list[float]]:
-        all_embeddings = []
-        for i in range(0, len(input), self.batch_size):
-            batch = input[i:i + self.batch_size]
-            response = genai_client.models.embed_content(
-                model=self.model,
-                contents=batch,
-                config=types.EmbedContentConfig(task_type="SEMANTIC_SIMILARITY")
-            )
-            all_embeddings.extend([list(e.values) for e in response.embeddings])
-        return all_embeddings
+        with span("embed", texts=len(input)) as attrs:
+            keys = [self.cache.make_key(self.model, self.task_type, text) for text in input]
+            resolved = self.cache.get_many(keys)
+
+            # Deduplicate misses so repeated texts in one call are embedded once
+            missing = {}
+            for key, text in zip(keys, input):
+                if key not in resolved:
+                    missing.setdefault(key, text)
+            attrs["cache_misses"] = len(missing)
+            count("embedding_cache_hits", len(set(keys)) - len(missing))
+            count("embedding_cache_misses", len(missing))
+
+            missing_items = list(missing.items())
+            for i in range(0, len(missing_items), self.batch_size):
+                batch = missing_items[i:i + self.batch_size]
+                with span("embed.api", batch_size=len(batch)):
+                    response = self._embed_batch([text for _, text in batch])
+                count("gemini_embed_calls")
+                count("gemini_embedded_texts", len(batch))
+                fresh = {key: list(e.values) for (key, _), e in zip(batch, response.embeddings)}
+                self.cache.put_many(fresh)
+                resolved.update(fresh)
+
+            return [resolved[key] for key in keys]
+
+    def _embed_batch(self, texts: list[str]):
+        from google.genai import types
+        client = self._client or get_genai_client()
+        return client.models.embed_content(
+            model=self.model,
+            contents=texts,
+            config=types.EmbedContentConfig(task_type=self.task_type)
+        )
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
 
     # Required by Chroma for collection creation
     def name(self) -> str:
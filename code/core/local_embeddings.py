@@ -0,0 +1,45 @@
+import re
+import zlib
+import numpy as np
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class HashingEmbeddingFunction:
+    """
+    დეტერმინისტული, ქსელისგან დამოუკიდებელი ემბედინგის ფუნქცია, რომელიც GeminiEmbeddingFunction-ის ინტერფეისს იმეორებს.
+    ტექსტის სიტყვების სიმბოლურ n-გრამებს ჰეშირებით ანაწილებს dim ზომის ვექტორში (ნიშნიანი feature hashing) და აბრუნებს
+    L2-ნორმალიზებულ ვექტორს. გამოიყენება ბენჩმარკებსა და ლოკალურ ტესტებში Gemini API-ს ნაცვლად.
+    """
+
+    def __init__(self, dim=768, ngram_range=(3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def __call__(self, input: list[str]) -> list[list[float]]:
+        return self._embed(input)
+
+    def embed_documents(self, input: list[str]) -> list[list[float]]:
+        return self._embed(input)
+
+    def embed_query(self, input: str, **kwargs) -> list[float]:
+        return self._embed([input])[0]
+
+    def _vector(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        low, high = self.ngram_range
+        for word in WORD_PATTERN.findall(text.lower()):
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                for i in range(max(len(padded) - n + 1, 1)):
+                    h = zlib.crc32(padded[i:i + n].encode("utf-8"))
+                    # The top bit picks the sign so that collisions tend to cancel out
+                    vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _embed(self, input: list[str]) -> list[list[float]]:
+        return [self._vector(text).tolist() for text in input]
+
+    def name(self) -> str:
+        return f"HashingEmbeddingFunction-{self.dim}"
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram buckets (seconds) for span durations, from sub-millisecond BM25 lookups to long LLM generations
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger("rag.trace")
+if not logger.handlers and os.getenv("RAG_TRACE_LOGS", "1") != "0":
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_current_trace = contextvars.ContextVar("rag_current_trace", default=None)
+
+
+class Trace:
+    """ერთი მოთხოვნის (request) ტრეისი: ეტაპების (span) ხანგრძლივობები, მრიცხველები და ატრიბუტები."""
+
+    def __init__(self, name, **attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = dict(attrs)
+        self.spans = []
+        self.counters = {}
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self._lock = threading.Lock()
+
+    def add_span(self, name, start, duration, attrs):
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "start_ms": round((start - self._start) * 1000, 3),
+                "duration_ms": round(duration * 1000, 3),
+                **attrs,
+            })
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "trace_id": self.trace_id,
+                "name": self.name,
+                "timestamp": self.started_at,
+                "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+                **self.attrs,
+                "spans": list(self.spans),
+                "counters": dict(self.counters),
+            }
+
+
+class MetricsRegistry:
+    """პროცესის დონის მეტრიკები (მრიცხველები და ხანგრძლივობის ჰისტოგრამები) Prometheus-ის ტექსტური ფორმატით."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, span_name, seconds):
+        with self._lock:
+            histogram = self._histograms.setdefault(
+                span_name, {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0}
+            )
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def render_prometheus(self):
+        with self._lock:
+            lines = []
+            if self._histograms:
+                lines.append("# TYPE rag_span_duration_seconds histogram")
+            for span_name, histogram in sorted(self._histograms.items()):
+                for bound, value in zip(DURATION_BUCKETS, histogram["buckets"]):
+                    lines.append(f'rag_span_duration_seconds_bucket{{span="{span_name}",le="{bound}"}} {value}')
+                lines.append(f'rag_span_duration_seconds_bucket{{span="{span_name}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'rag_span_duration_seconds_sum{{span="{span_name}"}} {histogram["sum"]:.6f}')
+                lines.append(f'rag_span_duration_seconds_count{{span="{span_name}"}} {histogram["count"]}')
+            for name, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE rag_{name}_total counter")
+                lines.append(f"rag_{name}_total {value}")
+            for name, value in sorted(self._gauges.items()):
+                lines.append(f"# TYPE rag_{name} gauge")
+                lines.append(f"rag_{name} {value}")
+            return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+_last_trace = None
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def last_trace():
+    """ბოლო დასრულებული ტრეისი (dict სახით) ან None."""
+    return _last_trace
+
+
+@contextmanager
+def start_trace(name, **attrs):
+    """
+    იწყებს ახალ მოთხოვნის ტრეისს. ამ ბლოკში გამოძახებული span()/count() ჩანაწერები ამ ტრეისს ემატება,
+    დასრულებისას კი ტრეისი იწერება სტრუქტურირებული JSON ლოგის სახით.
+    """
+    global _last_trace
+    trace = Trace(name, **attrs)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.duration = time.perf_counter() - trace._start
+        metrics.observe(name, trace.duration)
+        metrics.inc("requests")
+        record = trace.to_dict()
+        _last_trace = record
+        logger.info(json.dumps(record, ensure_ascii=False))
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    ზომავს კოდის ბლოკის ხანგრძლივობას. yield-ით დაბრუნებულ dict-ში შეიძლება დამატებითი ატრიბუტების ჩაწერა
+    (მაგ., batch ზომა ან კანდიდატების რაოდენობა), რომლებიც span-თან ერთად ინახება.
+    """
+    span_attrs = dict(attrs)
+    start = time.perf_counter()
+    try:
+        yield span_attrs
+    finally:
+        duration = time.perf_counter() - start
+        metrics.observe(name, duration)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, start, duration, span_attrs)
+
+
+def count(name, value=1):
+    """ზრდის მრიცხველს როგორც მიმდინარე ტრეისში, ისე პროცესის დონის მეტრიკებში."""
+    metrics.inc(name, value)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.count(name, value)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """უშვებს /metrics HTTP endpoint-ს ფონურ თრედში და აბრუნებს სერვერის ობიექტს."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"✅ Metrics endpoint listening on http://{host}:{port}/metrics")
+    return server
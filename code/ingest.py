@@ -0,0 +1,56 @@
+import os
+import argparse
+from dotenv import load_dotenv
+from processing.data_processing import process_and_save_chunks, is_main_document, MAIN_DOCX_PATH
+from rag_pipeline.vector_store import load_data, build_quantized_index, VECTOR_BACKEND, QUANTIZED_INDEX_FILE
+from rag_pipeline.index_bundle import build_bundle
+from core.embeddings import GeminiEmbeddingFunction
+from core.bulk_embedding import BulkEmbedder
+
+load_dotenv()
+
+
+def main():
+    """
+    DOCX დოკუმენტის ხელახალი დამუშავება და ვექტორული ბაზის ინკრემენტული განახლება.
+    ხელახლა ემბედდება მხოლოდ შეცვლილი ან ახალი ფრაგმენტები, ამოღებული ფრაგმენტები კი იშლება.
+    ბოლოს იგება ინდექსების ბანდლი, რომელსაც აპლიკაცია გაშვებისას memmap-ით ტვირთავს, და ახლდება კვანტირებული ინდექსი.
+    გაშვება პროექტის მთავარი დირექტორიიდან: python code/ingest.py
+    დამატებითი დოკუმენტებისთვის (მაგ., ცვლილებების ბიულეტენები): python code/ingest.py a.docx b.docx --workers 4
+    სამოქალაქო კოდექსის ძირითადი დოკუმენტი (DOCX_FILE) ყოველთვის მუშავდება: სინქრონიზაცია შლის ყველა ფრაგმენტს,
+    რომელიც ახალ ნაკრებში არ არის, ამიტომ მისი გამოტოვება კოდექსს ვექტორული ბაზიდან წაშლიდა.
+    ემბედინგი პარალელურად მიმდინარეობს (--embed-concurrency, --requests-per-minute); შეწყვეტის შემთხვევაში
+    ხელახალი გაშვება უკვე ემბედდებულ batch-ებს ქეშიდან იღებს.
+    """
+    parser = argparse.ArgumentParser(description="Chunk DOCX documents and sync the vector store")
+    parser.add_argument("docx_files", nargs="*", default=[],
+                        help="additional DOCX documents; the main civil code document is always included")
+    parser.add_argument("--workers", type=int, default=1, help="process documents in parallel worker processes")
+    parser.add_argument("--embed-concurrency", type=int, help="concurrent embedding requests (EMBED_CONCURRENCY)")
+    parser.add_argument("--requests-per-minute", type=float,
+                        help="embedding request rate limit, 0 to disable (EMBED_REQUESTS_PER_MINUTE)")
+    parser.add_argument("--tokens-per-minute", type=float,
+                        help="embedding token rate limit, 0 to disable (EMBED_TOKENS_PER_MINUTE)")
+    args = parser.parse_args()
+
+    # The sync deletes every chunk id missing from this run, so the main document must always be part of it
+    docx_files = [MAIN_DOCX_PATH] + [path for path in args.docx_files if not is_main_document(path)]
+    chunks = process_and_save_chunks(docx_files, workers=args.workers)
+    embedding_model = GeminiEmbeddingFunction()
+    bulk_embedder = BulkEmbedder(
+        embedding_model,
+        concurrency=args.embed_concurrency,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+    )
+    collection = load_data(chunks, sync=True, embedding_function=embedding_model, bulk_embedder=bulk_embedder)
+    build_bundle(chunks, collection, embedding_model)
+    # The quantized index copies the collection's vectors: rebuild it now, or drop it so it cannot serve stale ones
+    if VECTOR_BACKEND == "quantized":
+        build_quantized_index(chunks, collection)
+    elif os.path.exists(QUANTIZED_INDEX_FILE):
+        os.remove(QUANTIZED_INDEX_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,80 @@
+import os
+import time
 import streamlit as st
 from dotenv import load_dotenv
-from rag_pipeline.vector_store import load_data
-from rag_pipeline.llm import answer_question
+from rag_pipeline.vector_store import open_vector_store
+from rag_pipeline.llm import stream_answer
 from processing.data_processing import load_chunks
 from rag_pipeline.hybrid_rag import HybridRAG
+from rag_pipeline.answer_cache import AnswerCache
+from rag_pipeline.context_assembler import ContextAssembler
+from rag_pipeline.index_bundle import load_bundle
+from core.embeddings import GeminiEmbeddingFunction
+from core.tracing import start_trace, start_metrics_server, metrics, span
 
 load_dotenv()
 
+@st.cache_resource
+def initialize_metrics_server():
+    """
+    Prometheus-ის ფორმატის /metrics endpoint, პროცესში ერთხელ. ცალკე ქეშირდება, რომ RAG-ის ინიციალიზაციის
+    ხელახალმა ცდამ (rerun წარუმატებლობის შემდეგ) პორტის ხელახლა დაკავება არ სცადოს.
+    """
+    if not os.getenv("METRICS_PORT"):
+        return None
+    try:
+        return start_metrics_server(int(os.getenv("METRICS_PORT")))
+    except OSError as e:
+        # A busy port must not take the chat down; the result is cached, so this is not retried on every rerun
+        print(f"⚠️ Metrics endpoint not started: {e}")
+        return None
+
 @st.cache_resource
 def initialize_rag_system():
     """RAG სისტემის ინიციალიზაცია"""
-    chunks = load_chunks()
-    collection = load_data(chunks)
+    started = time.perf_counter()
+    embedding_model = GeminiEmbeddingFunction()
+    # Prebuilt bundle (python code/ingest.py): memory-mapped indexes, no tokenization or Chroma scans at startup
+    bundle = load_bundle(embedding_model.name())
+    if bundle is not None:
+        chunks = bundle.chunks
+        # The bundle's full-precision matrix lets the quantized backend rescore its candidates
+        collection = open_vector_store(chunks, embedding_function=embedding_model, full_vectors=bundle.reranker.matrix)
+        rag = HybridRAG(collection, chunks, embedding_model=embedding_model,
+                        sparse=bundle.sparse, reranker=bundle.reranker)
+    else:
+        chunks = load_chunks()
+        collection = open_vector_store(chunks, embedding_function=embedding_model)
+        rag = HybridRAG(collection, chunks, embedding_model=embedding_model)
+
+    startup_seconds = time.perf_counter() - started
+    metrics.set_gauge("startup_seconds", round(startup_seconds, 3))
+    print(f"✅ RAG system ready in {startup_seconds:.2f}s")
+    return rag
+
+@st.cache_resource
+def initialize_answer_cache():
+    """სესიებს შორის გაზიარებული პასუხების ქეში"""
+    return AnswerCache()
+
+def render_trace_panel(trace):
+    """გვერდით პანელში აჩვენებს ბოლო მოთხოვნის დროის განაწილებას ეტაპების მიხედვით."""
+    with st.sidebar:
+        st.subheader("⏱️ ბოლო მოთხოვნა")
+        if trace is None:
+            st.caption("ჯერ არცერთი მოთხოვნა არ შესრულებულა.")
+            return
+        st.metric("სრული დრო", f"{trace['duration_ms']:.0f} ms")
+        st.dataframe(
+            [
+                {key: value for key, value in span.items() if key in ("name", "start_ms", "duration_ms")}
+                for span in trace["spans"]
+            ],
+            hide_index=True,
+        )
+        if trace["counters"]:
+            st.json(trace["counters"])
 
-    return HybridRAG(collection, chunks)
 
 def main():
     """
@@ -30,7 +91,10 @@ def main():
     """
 
     # Initialize the entire RAG system and cache it
+    initialize_metrics_server()
     rag = initialize_rag_system()
+    answer_cache = initialize_answer_cache()
+    answer_cache.set_corpus_version(rag.corpus_version)
 
     with st.chat_message("ai"):
         st.write(welcome)
@@ -53,21 +117,46 @@ def main():
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # Stream response
-        results = rag.retrieve(prompt)
+        with start_trace("chat") as trace:
+            # Stream response
+            hits = rag.retrieve_hits(prompt)
+
+            # Merge parts of the same article and keep the prompt within the token budget
+            with span("assemble_context") as attrs:
+                assembled = ContextAssembler().assemble(hits)
+                attrs["tokens"] = assembled.tokens
+            context = assembled.text
 
-        context = "\n\n".join(results)
+            # Already in the embedding cache after retrieval; None for direct article lookups, which embed nothing
+            article_ids = assembled.chunk_ids
+            query_emb = rag.answer_cache_embedding(prompt)
+            cached = answer_cache.get(prompt, query_emb, context, article_ids)
 
-        
-        with st.status("ვამუშავებ პასუხს!...", expanded=True) as status:
             with st.chat_message("ai"):
-                response = answer_question(prompt, context)
-                # print(response)
-                st.write(response)
+                stats = {}
+                if cached is not None:
+                    response = cached
+                    st.markdown(response)
+                    st.caption("💾 პასუხი აღებულია ქეშიდან")
+                else:
+                    # Stream the answer as it is generated instead of waiting for the full response
+                    response = st.write_stream(stream_answer(prompt, context, stats))
+                    answer_cache.put(prompt, query_emb, context, article_ids, response)
                 st.session_state.messages.append({"role": "assistant", "content": response})
-            status.update(
-                label="დასრულებულია!", state="complete", expanded=True
-                )
+                if assembled.citations:
+                    st.caption("📚 კონტექსტი: " + ", ".join(f"მუხლი {number}" for number in assembled.article_numbers()))
+                if stats.get("coalesced"):
+                    st.caption("🔗 იგივე კითხვაზე პასუხი ამავე დროს სხვა მომხმარებლისთვისაც გენერირდებოდა და გაზიარდა")
+                elif "time_to_first_token" in stats:
+                    st.caption(
+                        f"⏱️ პირველი ტოკენი: {stats['time_to_first_token']:.2f} წმ · "
+                        f"სრული პასუხი: {stats['total_time']:.2f} წმ · "
+                        f"ტოკენები: {stats.get('total_tokens')}"
+                    )
+        st.session_state.last_trace = trace.to_dict()
+
+    if st.sidebar.checkbox("⏱️ დროის განაწილების ჩვენება", value=False):
+        render_trace_panel(st.session_state.get("last_trace"))
     
 
 if __name__ == "__main__":
@@ -1,54 +1,63 @@
 import re
-from typing import List, Dict
+import json
+import hashlib
+from typing import Dict, Iterable, Iterator, List
 
-def chunk_georgian_civil_code(full_text: str) -> List[Dict]:
-    """
-    ეს ფუნქცია იღებს საქართველოს სამოქალაქო კოდექსის სრულ ტექსტს (full_text) და ყოფს მას მცირე ფრაგმენტებად (chunks), რომლებიც გამოიყენება ძიებისა და ანალიზისთვის.
-    1. ტექსტის დაყოფა:
-        ყოფს ტექსტს მუხლების მიხედვით, რეგულარული გამოსახულების (მუხლი [\d¹²³⁴⁵⁶⁷⁸⁹⁰]+) გამოყენებით.
-        ამოიცნობს წიგნისა და თავის მარკერებს (მაგ., „წიგნი I“, „თავი II“) და ინახავს მათ მეტამონაცემებში.
+MAX_CHUNK_SIZE = 1200  # smaller chunks improve recall
+SOURCE = "საქართველოს სამოქალაქო კოდექსი"
 
-    2. მუხლის დამუშავება:
-        ამოიღებს მუხლის ნომერსა და სათაურს, ასუფთავებს ტექსტს მუხლის სათაურის ხაზისაგან.
-        თითოეული მუხლისთვის ქმნის მეტამონაცემებს, რომლებიც მოიცავს წყაროს, წიგნს, თავს, მუხლის ნომერსა და სათაურს.
+ARTICLE_NUMBER_CHARS = r"[\d\u200b¹²³⁴⁵⁶⁷⁸⁹⁰]"
+# Every "მუხლი N" occurrence starts a new article segment
+ARTICLE_START_PATTERN = re.compile(rf"მუხლი {ARTICLE_NUMBER_CHARS}")
+# The header line, which is also removed from the article text
+ARTICLE_HEADER_PATTERN = re.compile(rf"მუხლი ({ARTICLE_NUMBER_CHARS}+)\.?\s*(.*)\n?")
+BOOK_PATTERN = re.compile(r"წიგნი\s+[^\s]+")
+CHAPTER_PATTERN = re.compile(r"თავი\s+[^\s]+")
+# Split by numbered paragraphs (1. 2. ა) ბ) etc.)
+PARAGRAPH_PATTERN = re.compile(r"(?=\d+\.\s|[ა-ი]\)\s)")
 
-    3. ფრაგმენტებად დაყოფა:
-        თუ მუხლის ტექსტი ჯდება MAX_CHUNK_SIZE (1200 სიმბოლო) ზღვარში, ის ერთ ფრაგმენტად ინახება.
-        თუ ტექსტი აღემატება ზღვარს, ყოფს მას პუნქტებად (მაგ., „1.“, „ა)“) და ქმნის ცალკე ფრაგმენტებს თითოეული პუნქტისთვის, ამატებს „ნაწილი X“ ინფორმაციას.
 
-    4. დაბრუნება:
-        აბრუნებს ფრაგმენტების სიას, სადაც თითოეული ფრაგმენტი შეიცავს ტექსტს (text) და მეტამონაცემებს (metadata).
+def iter_article_segments(lines: Iterable[str]) -> Iterator[str]:
+    """
+    ნაკადურად აბრუნებს ტექსტის მონაკვეთებს, რომელთაგან თითოეული „მუხლი N“-ით იწყება (პირველი მონაკვეთის გარდა).
+    შედეგი იგივეა, რაც "\n".join(lines)-ის დაყოფა მუხლების მიხედვით, მაგრამ მთელი ტექსტი ერთ სტრიქონად არ იკრიბება.
+    """
+    buffer = []
+    for line in lines:
+        position = 0
+        for match in ARTICLE_START_PATTERN.finditer(line):
+            buffer.append(line[position:match.start()])
+            yield "\n".join(buffer)
+            buffer = []
+            position = match.start()
+        buffer.append(line[position:])
+    if buffer:
+        yield "\n".join(buffer)
+
+
+def iter_chunks(lines: Iterable[str], source: str = SOURCE) -> Iterator[Dict]:
+    """
+    ნაკადური ჩანქერი: გასუფთავებული პარაგრაფებიდან (lines) მუხლების საზღვრებს ინკრემენტულად პოულობს და
+    ფრაგმენტებს მაშინვე აბრუნებს. ფრაგმენტებს id-ები ჯერ არ აქვთ — მათ iter_chunk_ids ანიჭებს.
     """
-
-    MAX_CHUNK_SIZE = 1200  # smaller chunks improve recall
-    if not full_text:
-        return []
-
-    # Split by article
-    article_pattern = r'(?=მუხლი [\d\u200b¹²³⁴⁵⁶⁷⁸⁹⁰]+\.?\s*.*)'
-    raw_articles = re.split(article_pattern, full_text)
-
-    chunks = []
     current_book = None
     current_chapter = None
 
-    for article_text in raw_articles:
+    for article_text in iter_article_segments(lines):
         if not article_text.strip():
             continue
 
         # detect book/chapter markers
-        book_match = re.search(r'წიგნი\s+[^\s]+', article_text)
+        book_match = BOOK_PATTERN.search(article_text)
         if book_match:
             current_book = book_match.group(0)
 
-        chapter_match = re.search(r'თავი\s+[^\s]+', article_text)
+        chapter_match = CHAPTER_PATTERN.search(article_text)
         if chapter_match:
             current_chapter = chapter_match.group(0)
 
         # parse article header
-        article_header_match = re.search(
-            r'მუხლი ([\d\u200b¹²³⁴⁵⁶⁷⁸⁹⁰]+)\.?\s*(.*)', article_text
-        )
+        article_header_match = ARTICLE_HEADER_PATTERN.search(article_text)
         if not article_header_match:
             continue
 
@@ -56,44 +65,96 @@ def chunk_georgian_civil_code(full_text: str) -> List[Dict]:
         article_title = article_header_match.group(2).strip()
 
         # remove the "მუხლი N ..." line from text
-        cleaned_text = re.sub(
-            r'მუხლი [\d\u200b¹²³⁴⁵⁶⁷⁸⁹⁰]+\.?\s*.*\n?', '', article_text, 1
+        cleaned_text = (
+            article_text[:article_header_match.start()] + article_text[article_header_match.end():]
         ).strip()
 
         base_metadata = {
-            "source": "საქართველოს სამოქალაქო კოდექსი",
+            "source": source,
             "book": current_book if current_book else "უცნობი წიგნი",
             "chapter": current_chapter if current_chapter else "უცნობი თავი",
             "article_number": article_number_str,
             "article_title": article_title
         }
 
-
         # Keep chunk text simple & focused
         header_str = f"მუხლი {article_number_str}. {article_title}"
 
         # If article fits in one chunk
         if len(cleaned_text) <= MAX_CHUNK_SIZE:
-            chunks.append({
+            yield {
                 "text": f"{header_str}\n\n{cleaned_text}",
                 "metadata": base_metadata
-            })
-        else:
-            # Split by numbered paragraphs (1. 2. ა) ბ) etc.)
-            paragraph_pattern = r'(?=\d+\.\s|[ა-ი]\)\s)'
-            sub_chunks = re.split(paragraph_pattern, cleaned_text)
-
-            for i, sub_chunk_text in enumerate(sub_chunks):
-                if sub_chunk_text.strip():
-                    sub_chunk_metadata = base_metadata.copy()
-                    sub_chunk_metadata['sub_chunk_seq'] = i + 1
-
-                    chunk_text = (
-                        f"{header_str} (ნაწილი {i+1})\n\n{sub_chunk_text.strip()}"
-                    )
-                    chunks.append({
-                        "text": chunk_text,
-                        "metadata": sub_chunk_metadata
-                    })
-
-    return chunks
+            }
+            continue
+
+        for i, sub_chunk_text in enumerate(PARAGRAPH_PATTERN.split(cleaned_text)):
+            if sub_chunk_text.strip():
+                sub_chunk_metadata = base_metadata.copy()
+                sub_chunk_metadata['sub_chunk_seq'] = i + 1
+
+                yield {
+                    "text": f"{header_str} (ნაწილი {i+1})\n\n{sub_chunk_text.strip()}",
+                    "metadata": sub_chunk_metadata
+                }
+
+
+def chunk_georgian_civil_code(full_text: str) -> List[Dict]:
+    """
+    ეს ფუნქცია იღებს საქართველოს სამოქალაქო კოდექსის სრულ ტექსტს (full_text) და ყოფს მას მცირე ფრაგმენტებად (chunks), რომლებიც გამოიყენება ძიებისა და ანალიზისთვის.
+    1. ტექსტის დაყოფა:
+        ყოფს ტექსტს მუხლების მიხედვით, რეგულარული გამოსახულების (მუხლი [\d¹²³⁴⁵⁶⁷⁸⁹⁰]+) გამოყენებით.
+        ამოიცნობს წიგნისა და თავის მარკერებს (მაგ., „წიგნი I“, „თავი II“) და ინახავს მათ მეტამონაცემებში.
+
+    2. მუხლის დამუშავება:
+        ამოიღებს მუხლის ნომერსა და სათაურს, ასუფთავებს ტექსტს მუხლის სათაურის ხაზისაგან.
+        თითოეული მუხლისთვის ქმნის მეტამონაცემებს, რომლებიც მოიცავს წყაროს, წიგნს, თავს, მუხლის ნომერსა და სათაურს.
+
+    3. ფრაგმენტებად დაყოფა:
+        თუ მუხლის ტექსტი ჯდება MAX_CHUNK_SIZE (1200 სიმბოლო) ზღვარში, ის ერთ ფრაგმენტად ინახება.
+        თუ ტექსტი აღემატება ზღვარს, ყოფს მას პუნქტებად (მაგ., „1.“, „ა)“) და ქმნის ცალკე ფრაგმენტებს თითოეული პუნქტისთვის, ამატებს „ნაწილი X“ ინფორმაციას.
+
+    4. დაბრუნება:
+        აბრუნებს ფრაგმენტების სიას, სადაც თითოეული ფრაგმენტი შეიცავს სტაბილურ იდენტიფიკატორს (id), ტექსტს (text)
+        და მეტამონაცემებს (metadata), მათ შორის შინაარსის ჰეშს (content_hash).
+    დიდი დოკუმენტებისთვის უმჯობესია ნაკადური iter_chunks, რომელსაც ეს ფუნქცია იყენებს.
+    """
+    if not full_text:
+        return []
+    return list(iter_chunk_ids(iter_chunks(full_text.split("\n"))))
+
+
+def content_hash(chunk: Dict) -> str:
+    """ფრაგმენტის ტექსტისა და მეტამონაცემების ჰეში; იცვლება მხოლოდ მაშინ, როცა ფრაგმენტი რეალურად შეიცვალა."""
+    metadata = {k: v for k, v in chunk["metadata"].items() if k != "content_hash"}
+    payload = chunk["text"] + "\0" + json.dumps(metadata, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def iter_chunk_ids(chunks: Iterable[Dict], namespace: str = "") -> Iterator[Dict]:
+    """
+    თითოეულ ფრაგმენტს ანიჭებს სტაბილურ id-ს მუხლის ნომრისა (article_number) და ნაწილის ნომრის (sub_chunk_seq) მიხედვით
+    (მაგ., „art_12“, „art_1191²_part_3“) და მეტამონაცემებში წერს content_hash-ს.
+    კოდექსში ცვლილების შეტანისას სხვა მუხლების id-ები არ იცვლება, რაც ინკრემენტულ ინდექსაციას შესაძლებელს ხდის.
+    namespace (მაგ., „amendments_2024/“) ემატება id-ის დასაწყისში, რომ სხვადასხვა დოკუმენტის მუხლები ერთმანეთს არ დაემთხვეს.
+    """
+    seen = {}
+    for chunk in chunks:
+        metadata = chunk["metadata"]
+        chunk_id = f"{namespace}art_{metadata['article_number']}"
+        if "sub_chunk_seq" in metadata:
+            chunk_id += f"_part_{metadata['sub_chunk_seq']}"
+
+        # The same article number can occur twice (e.g. repealed and re-added articles)
+        seen[chunk_id] = seen.get(chunk_id, 0) + 1
+        if seen[chunk_id] > 1:
+            chunk_id += f"_dup_{seen[chunk_id]}"
+
+        chunk["id"] = chunk_id
+        metadata["content_hash"] = content_hash(chunk)
+        yield chunk
+
+
+def assign_chunk_ids(chunks: List[Dict]) -> List[Dict]:
+    """iter_chunk_ids-ის სიის ვერსია."""
+    return list(iter_chunk_ids(chunks))
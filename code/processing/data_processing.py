@@ -1,37 +1,156 @@
 import os
+import re
 import json
-from docx import Document
-from processing.chunking import chunk_georgian_civil_code
-from processing.text_processing import clean_noise
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import orjson
+from processing.chunking import SOURCE, iter_chunks, iter_chunk_ids
+from processing.text_processing import iter_paragraph_texts, iter_clean_paragraphs
 
-CHUNKS_FILE = "./data/chunks.json"
+CHUNKS_FILE = "./data/chunks.jsonl"
+# Chunk files written before the JSONL format (one indented JSON array)
+LEGACY_CHUNKS_FILE = "./data/chunks.json"
 DOCX_FILE = "./data/document.docx"
+# Scripts run from the project root; DOCX_FILE is resolved against it so the main document is found from any cwd
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MAIN_DOCX_PATH = os.path.normpath(os.path.join(PROJECT_ROOT, DOCX_FILE))
 
 
-def process_and_save_chunks():
-    """Parse DOCX, გაასუფთავე, დაყავი, და შეინახე JSON ფორმატში."""
-    print("🔄 Processing DOCX and creating chunks...")
-    document = Document(DOCX_FILE)
-    cleaned_paragraphs = clean_noise(document)
-    document_text = "\n".join(cleaned_paragraphs)
-    chunks = chunk_georgian_civil_code(document_text)
+def iter_document_chunks(docx_file=DOCX_FILE, source=SOURCE):
+    """ერთი DOCX-ის ნაკადური დამუშავება: პარაგრაფები → გასუფთავება → მუხლების საზღვრები → ფრაგმენტები (id-ების გარეშე)."""
+    return iter_chunks(iter_clean_paragraphs(iter_paragraph_texts(docx_file)), source)
+
+
+def _chunk_document(docx_file, source):
+    return list(iter_document_chunks(docx_file, source))
+
+
+def is_main_document(docx_file):
+    """არის თუ არა docx_file სამოქალაქო კოდექსის ძირითადი დოკუმენტი (DOCX_FILE პროექტის მთავარი დირექტორიიდან)."""
+    path = os.path.normpath(os.path.abspath(docx_file))
+    if path == MAIN_DOCX_PATH:
+        return True
+    return os.path.exists(path) and os.path.exists(MAIN_DOCX_PATH) and os.path.samefile(path, MAIN_DOCX_PATH)
+
+
+def document_namespaces(docx_files):
+    """
+    თითოეული დოკუმენტის (source, id-ების namespace) წყვილი. ძირითადი კოდექსი (DOCX_FILE) ინარჩუნებს SOURCE-ს და
+    „art_N“ id-ებს, ამიტომ მისი ინდექსები დამატებითი დოკუმენტების გამო არ იცვლება; დანარჩენი დოკუმენტების source
+    ფაილის სახელია, id-ები კი „<slug>/art_N“ ფორმისაა, დოკუმენტების თანმიმდევრობისგან დამოუკიდებლად.
+    """
+    namespaces = []
+    used = set()
+    for docx_file in docx_files:
+        if is_main_document(docx_file):
+            namespaces.append((SOURCE, ""))
+            continue
+        name = os.path.splitext(os.path.basename(docx_file))[0]
+        slug = re.sub(r"[^\w-]+", "_", name).strip("_").lower() or "document"
+        # Same file name in different directories
+        unique, n = slug, 1
+        while unique in used:
+            n += 1
+            unique = f"{slug}_{n}"
+        used.add(unique)
+        namespaces.append((name, f"{unique}/"))
+    return namespaces
+
+
+def iter_build_chunks(docx_files=DOCX_FILE, workers=1):
+    """
+    აბრუნებს ერთი ან რამდენიმე DOCX ფაილის ფრაგმენტებს სტაბილური id-ებით, დოკუმენტების თანმიმდევრობის შენარჩუნებით.
+    id-ები და source თითოეული დოკუმენტისთვის ცალკე ენიჭება (იხ. document_namespaces).
+    workers > 1 შემთხვევაში დოკუმენტები პარალელურად მუშავდება ცალკეულ პროცესებში; ერთი დოკუმენტი ყოველთვის
+    თანმიმდევრულად მუშავდება, რადგან წიგნისა და თავის მდგომარეობა მუხლიდან მუხლზე გადადის.
+    """
+    if isinstance(docx_files, (str, os.PathLike)):
+        docx_files = [docx_files]
+    namespaces = document_namespaces(docx_files)
+    sources = [source for source, _ in namespaces]
+
+    def document_chunks():
+        if workers > 1 and len(docx_files) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(docx_files))) as pool:
+                yield from pool.map(_chunk_document, docx_files, sources)
+        else:
+            for docx_file, source in zip(docx_files, sources):
+                yield iter_document_chunks(docx_file, source)
+
+    for chunks, (_, namespace) in zip(document_chunks(), namespaces):
+        yield from iter_chunk_ids(chunks, namespace)
 
-    with open(CHUNKS_FILE, "w", encoding="utf-8") as f:
-        json.dump(chunks, f, ensure_ascii=False, indent=2)
 
+def build_chunks(docx_files=DOCX_FILE, workers=1):
+    """Parse DOCX, გაასუფთავე და დაყავი ფრაგმენტებად დისკზე შენახვის გარეშე."""
+    return list(iter_build_chunks(docx_files, workers))
+
+
+def save_chunks(chunks, path=CHUNKS_FILE):
+    """
+    ფრაგმენტების ნაკადურად ჩაწერა JSONL ფორმატში (ერთი ფრაგმენტი ერთ ხაზზე, orjson-ით).
+    ფაილი ატომურად ანაცვლებს ძველს; აბრუნებს ჩაწერილ ფრაგმენტებს სიის სახით.
+    """
+    written = []
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        for chunk in chunks:
+            f.write(orjson.dumps(chunk))
+            f.write(b"\n")
+            written.append(chunk)
+    os.replace(tmp_path, path)
+    return written
+
+
+def iter_saved_chunks(path=CHUNKS_FILE):
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield orjson.loads(line)
+
+
+def process_and_save_chunks(docx_files=DOCX_FILE, workers=1):
+    """Parse DOCX, გაასუფთავე, დაყავი, და შეინახე JSONL ფორმატში."""
+    print("🔄 Processing DOCX and creating chunks...")
+    chunks = save_chunks(iter_build_chunks(docx_files, workers))
     print(f"✅ Saved {len(chunks)} chunks to {CHUNKS_FILE}")
     return chunks
 
 
 def load_chunks():
-    """თუ JSON უკვე არსებობს მანდედან წამოიღოს, თუ არა და დაამუშავოს თავიდან DOCX."""
-    if not os.path.exists(CHUNKS_FILE):
+    """თუ JSONL უკვე არსებობს მანდედან წამოიღოს (ძველი chunks.json-იც მიიღება), თუ არა და დაამუშავოს თავიდან DOCX."""
+    if os.path.exists(CHUNKS_FILE):
+        chunks = list(iter_saved_chunks())
+        print(f"✅ Loaded {len(chunks)} chunks from {CHUNKS_FILE}")
+        return chunks
+
+    if not os.path.exists(LEGACY_CHUNKS_FILE):
         return process_and_save_chunks()
 
-    with open(CHUNKS_FILE, "r", encoding="utf-8") as f:
+    with open(LEGACY_CHUNKS_FILE, "r", encoding="utf-8") as f:
         chunks = json.load(f)
 
-    print(f"✅ Loaded {len(chunks)} chunks from {CHUNKS_FILE}")
+    # Older chunk files were written before chunks carried stable ids
+    if chunks and "id" not in chunks[0]:
+        chunks = list(iter_chunk_ids(chunks))
+
+    # Migrate once, later starts read the JSONL file
+    save_chunks(chunks)
+    print(f"✅ Loaded {len(chunks)} chunks from {LEGACY_CHUNKS_FILE} and converted them to {CHUNKS_FILE}")
     return chunks
 
 
+def chunks_fingerprint(chunks):
+    """ფრაგმენტების ტექსტების ჰეში, რომლითაც დისკზე შენახული ინდექსები ამოწმებენ, ხომ არ არის ისინი მოძველებული."""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk['text'].encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def saved_chunks_fingerprint(path=CHUNKS_FILE):
+    """დისკზე შენახული ფრაგმენტების (chunks.jsonl) fingerprint; None, თუ ფაილი არ არსებობს."""
+    if not os.path.exists(path):
+        return None
+    return chunks_fingerprint(iter_saved_chunks(path))
@@ -1,44 +1,117 @@
 import re
+import zipfile
+from lxml import etree
+
+WORD_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W = f"{{{WORD_NS}}}"
+
+SUPERSCRIPTS = {str(i): c for i, c in enumerate("⁰¹²³⁴⁵⁶⁷⁸⁹")}
+SUPERSCRIPT_TABLE = str.maketrans(SUPERSCRIPTS)
+
+NOISE_PATTERN = re.compile(
+    r"(საქართველოს\s+საკონსტიტუციო\s+სასამართლოს\s+\d{4}\s+წლის\s+\d{1,2}\s+[ა-ჰ]+\s+გადაწყვეტილება\s+№[\d/,]+\s*–?\s*-?\s*(?:სსმ|ვებგვერდი).*?(?:\n|$))"
+    r"|"
+    r"(საქართველოს\s+\d{4}\s+წლის\s*\d{1,2}\s+[ა-ჰ]+\s+კანონი\s+№\d+\s*–?\s*-?\s*(?:სსმ|ვებგვერდი).*?(?:\n|$))",
+    flags=re.DOTALL
+)
+
+# Text equivalents of run content elements, as python-docx renders them in Run.text
+RUN_CONTENT_TEXT = {
+    f"{W}tab": "\t",
+    f"{W}ptab": "\t",
+    f"{W}cr": "\n",
+    f"{W}noBreakHyphen": "-",
+}
+
 
 def get_paragraph_text_with_superscripts(para):
     """
-    ეს ფუნქცია იღებს დოკუმენტის პარაგრაფს და ამუშავებს მის ტექსტს. 
-    ის ამოწმებს თითოეულ ტექსტურ ფრაგმენტს (run) პარაგრაფში და თუ ფრაგმენტი ზედა ინდექსითაა (superscript), 
+    ეს ფუნქცია იღებს დოკუმენტის პარაგრაფს და ამუშავებს მის ტექსტს.
+    ის ამოწმებს თითოეულ ტექსტურ ფრაგმენტს (run) პარაგრაფში და თუ ფრაგმენტი ზედა ინდექსითაა (superscript),
     იცვლება შესაბამისი ზედა ინდექსის სიმბოლოებით (მაგ., 0 ხდება ⁰). საბოლოოდ აბრუნებს პარაგრაფის სრულ ტექსტს, სადაც ზედა ინდექსები სწორადაა წარმოდგენილი.
     """
 
-    superscripts = {str(i): c for i, c in enumerate("⁰¹²³⁴⁵⁶⁷⁸⁹")}
     text_parts = []
     for run in para.runs:
         if run.font.superscript:
-            text_parts.append("".join(superscripts.get(ch, ch) for ch in run.text))
+            text_parts.append(run.text.translate(SUPERSCRIPT_TABLE))
         else:
             text_parts.append(run.text)
     return "".join(text_parts)
 
 
+def _run_text(run):
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == f"{W}t":
+            parts.append(child.text or "")
+        elif tag == f"{W}br":
+            parts.append("\n" if child.get(f"{W}type", "textWrapping") == "textWrapping" else "")
+        elif tag in RUN_CONTENT_TEXT:
+            parts.append(RUN_CONTENT_TEXT[tag])
+    return "".join(parts)
+
+
+def _is_superscript(run):
+    properties = run.find(f"{W}rPr")
+    if properties is None:
+        return False
+    vert_align = properties.find(f"{W}vertAlign")
+    return vert_align is not None and vert_align.get(f"{W}val") == "superscript"
+
+
+def iter_paragraph_texts(docx_file):
+    """
+    კითხულობს DOCX-ის word/document.xml-ს ნაკადურად (iterparse) და აბრუნებს დოკუმენტის ძირითადი ნაწილის (body)
+    პარაგრაფების ტექსტებს ზედა ინდექსების ჩათვლით, ისევე როგორც get_paragraph_text_with_superscripts,
+    მაგრამ python-docx-ის ობიექტების აგებისა და მთელი XML ხის მეხსიერებაში შენახვის გარეშე.
+    """
+    with zipfile.ZipFile(docx_file) as package, package.open("word/document.xml") as xml:
+        # Only paragraph and table ends are reported; nested paragraphs (e.g. in tables) are skipped below
+        for _, element in etree.iterparse(xml, events=("end",), tag=(f"{W}p", f"{W}tbl")):
+            parent = element.getparent()
+            if parent is None or parent.tag != f"{W}body":
+                continue
+            if element.tag == f"{W}p":
+                parts = []
+                for run in element.iterchildren(f"{W}r"):
+                    text = _run_text(run)
+                    parts.append(text.translate(SUPERSCRIPT_TABLE) if _is_superscript(run) else text)
+                yield "".join(parts)
+            # Processed top-level elements are no longer needed
+            element.clear()
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+def clean_text(text):
+    """შლის პარაგრაფიდან საკონსტიტუციო სასამართლოს გადაწყვეტილებებისა და ცვლილებების შემტანი კანონების ციტირებებს."""
+    if NOISE_PATTERN.search(text):
+        text = NOISE_PATTERN.sub("", text).strip()
+    return text
+
+
+def iter_clean_paragraphs(paragraph_texts):
+    """
+    clean_noise-ის ნაკადური ვერსია: ასუფთავებს პარაგრაფებს სათითაოდ და, როგორც clean_noise, ბოლო პარაგრაფს ცარიელით ანაცვლებს.
+    ამისთვის ერთ პარაგრაფს წინასწარ იკავებს, სანამ არ გაირკვევა, ბოლოა თუ არა ის.
+    """
+    previous = None
+    for text in paragraph_texts:
+        if previous is not None:
+            yield previous
+        previous = clean_text(text)
+    if previous is not None:
+        yield ""  # remove last noise
+
+
 def clean_noise(document):
     """
-    ფუნქცია იღებს დოკუმენტს და ასუფთავებს მას "ხმაურისგან" (noise) ტექსტისაგან, 
-    როგორიცაა საქართველოს საკონსტიტუციო სასამართლოს გადაწყვეტილებების ან კანონების ციტირებები (მაგ., „საქართველოს 2024 წლის გადაწყვეტილება №123...“). 
+    ფუნქცია იღებს დოკუმენტს და ასუფთავებს მას "ხმაურისგან" (noise) ტექსტისაგან,
+    როგორიცაა საქართველოს საკონსტიტუციო სასამართლოს გადაწყვეტილებების ან კანონების ციტირებები (მაგ., „საქართველოს 2024 წლის გადაწყვეტილება №123...“).
     ის იყენებს რეგულარულ გამოსახულებას (NOISE_PATTERN) ამგვარი ნაწილების იდენტიფიცირებისთვის,
     შლის მათ და აბრუნებს გასუფთავებული პარაგრაფების სიას. ბოლო პარაგრაფი ცარიელდება, რათა თავიდან აიცილოს ნარჩენი ხმაური.
     """
-    
-    NOISE_PATTERN = re.compile(
-        r"(საქართველოს\s+საკონსტიტუციო\s+სასამართლოს\s+\d{4}\s+წლის\s+\d{1,2}\s+[ა-ჰ]+\s+გადაწყვეტილება\s+№[\d/,]+\s*–?\s*-?\s*(?:სსმ|ვებგვერდი).*?(?:\n|$))"
-        r"|"
-        r"(საქართველოს\s+\d{4}\s+წლის\s*\d{1,2}\s+[ა-ჰ]+\s+კანონი\s+№\d+\s*–?\s*-?\s*(?:სსმ|ვებგვერდი).*?(?:\n|$))",
-        flags=re.DOTALL
-    )
-
-    cleaned = []
-    for para in document.paragraphs:
-        text = get_paragraph_text_with_superscripts(para)
-        if NOISE_PATTERN.search(text):
-            text = NOISE_PATTERN.sub("", text).strip()
-        cleaned.append(text)
-
-    if cleaned:
-        cleaned[-1] = ""  # remove last noise
-    return cleaned
+
+    return list(iter_clean_paragraphs(get_paragraph_text_with_superscripts(para) for para in document.paragraphs))
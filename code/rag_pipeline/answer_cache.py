@@ -0,0 +1,133 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from core.tracing import count
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_question(question):
+    """კითხვის ნორმალიზაცია ზუსტი დამთხვევისთვის: ზედმეტი სფეისები, რეგისტრი და ბოლო პუნქტუაცია არ ითვლება."""
+    return WHITESPACE_PATTERN.sub(" ", question).strip().lower().rstrip("?!.;,… ")
+
+
+class AnswerCache:
+    """
+    LLM პასუხების ქეში answer_question-ის წინ.
+    ზუსტი დამთხვევა: ნორმალიზებული კითხვა + მოძიებული კონტექსტის ჰეში.
+    სემანტიკური დამთხვევა: კითხვის ემბედინგის კოსინუსური მსგავსება similarity_threshold-ზე მეტია და
+    მოძიებული ფრაგმენტების სიმრავლე (article_ids) ზუსტად იგივეა.
+    ჩანაწერებს აქვთ TTL და LRU ლიმიტი; კორპუსის ვერსიის (chunks fingerprint) ცვლილებისას ქეში სრულად სუფთავდება.
+    """
+
+    def __init__(self, max_entries=None, ttl_seconds=None, similarity_threshold=None, corpus_version=None):
+        # An explicit 0 is a valid setting (max_entries=0 disables the cache), so only None falls back to the env
+        self.max_entries = (
+            max_entries if max_entries is not None else int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+        )
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None else float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+        )
+        self.similarity_threshold = (
+            similarity_threshold if similarity_threshold is not None
+            else float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+        )
+        self.corpus_version = corpus_version
+
+        self._entries = OrderedDict()
+        # article set -> exact keys, so near-duplicate search only looks at matching contexts
+        self._by_articles = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(question, context):
+        context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()
+        return f"{normalize_question(question)}\x1f{context_hash}"
+
+    def set_corpus_version(self, corpus_version):
+        """ფრაგმენტების კორპუსის შეცვლისას (ახალი fingerprint) ყველა შენახული პასუხი უქმდება."""
+        with self._lock:
+            if corpus_version != self.corpus_version:
+                self._clear()
+                self.corpus_version = corpus_version
+
+    def _clear(self):
+        self._entries.clear()
+        self._by_articles.clear()
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_articles.get(entry["articles"])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_articles[entry["articles"]]
+
+    def _expired(self, entry, now):
+        return now - entry["created_at"] > self.ttl_seconds
+
+    def get(self, question, question_emb, context, article_ids):
+        """აბრუნებს შენახულ პასუხს ან None-ს."""
+        now = time.time()
+        key = self._key(question, context)
+        articles = frozenset(article_ids)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry, now):
+                self._entries.move_to_end(key)
+                count("answer_cache_exact_hits")
+                return entry["answer"]
+
+            if question_emb is not None:
+                query = np.array(question_emb, dtype=np.float32)
+                query /= np.linalg.norm(query) or 1.0
+                best_key, best_score = None, self.similarity_threshold
+                for candidate_key in list(self._by_articles.get(articles, ())):
+                    candidate = self._entries[candidate_key]
+                    if self._expired(candidate, now):
+                        self._remove(candidate_key)
+                        continue
+                    score = float(candidate["embedding"] @ query)
+                    if score >= best_score:
+                        best_key, best_score = candidate_key, score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    count("answer_cache_semantic_hits")
+                    return self._entries[best_key]["answer"]
+
+        count("answer_cache_misses")
+        return None
+
+    def put(self, question, question_emb, context, article_ids, answer):
+        key = self._key(question, context)
+        articles = frozenset(article_ids)
+        embedding = None
+        if question_emb is not None:
+            embedding = np.array(question_emb, dtype=np.float32)
+            embedding /= np.linalg.norm(embedding) or 1.0
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = {
+                "answer": answer,
+                "embedding": embedding,
+                "articles": articles,
+                "created_at": time.time(),
+            }
+            if embedding is not None:
+                self._by_articles.setdefault(articles, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,221 @@
+import re
+import numpy as np
+
+SUPERSCRIPT_DIGITS = "⁰¹²³⁴⁵⁶⁷⁸⁹"
+TO_SUPERSCRIPT = str.maketrans("0123456789", SUPERSCRIPT_DIGITS)
+
+ARTICLE_NUMBER = rf"\d+(?:[{SUPERSCRIPT_DIGITS}]+|\^\d+)?"
+# "მუხლი 12", "მუხლები 12 და 13", "მუხ. 12¹"; the genitive "მუხლის 2" usually means a paragraph, so it is not matched
+ARTICLE_AFTER_PATTERN = re.compile(
+    rf"(?:მუხლი|მუხლები|მუხ\.)\s*({ARTICLE_NUMBER}(?:\s*(?:,|და)\s*{ARTICLE_NUMBER})*)"
+)
+# "მე-12 მუხლი", "12-ე მუხლის", "1-ლი მუხლით", "129 მუხლი"
+ARTICLE_BEFORE_PATTERN = re.compile(rf"(?:მე-)?({ARTICLE_NUMBER})(?:-ე|-ლი)?\s+მუხლ")
+ARTICLE_NUMBER_PATTERN = re.compile(ARTICLE_NUMBER)
+
+ROMAN_VALUES = {"I": 1, "V": 5, "X": 10, "L": 50, "C": 100}
+UNIT_STEMS = ["", "ერთ", "ორ", "სამ", "ოთხ", "ხუთ", "ექვს", "შვიდ", "რვ", "ცხრ"]
+TEEN_STEMS = ["ათ", "თერთმეტ", "თორმეტ", "ცამეტ", "თოთხმეტ", "თხუთმეტ", "თექვსმეტ", "ჩვიდმეტ", "თვრამეტ", "ცხრამეტ"]
+SCORE_STEMS = ["", "ოც", "ორმოც", "სამოც", "ოთხმოც"]
+
+
+def _ordinal_stem(n):
+    if n < 10:
+        return UNIT_STEMS[n]
+    return TEEN_STEMS[n - 10]
+
+
+def georgian_ordinal(n):
+    """რიცხვის ქართული რიგობითი ფორმა, როგორც კოდექსის სათაურებში (1 → „პირველი“, 21 → „ოცდამეერთე“)."""
+    if n == 1:
+        return "პირველი"
+    if n < 20:
+        return f"მე{_ordinal_stem(n)}ე"
+    score, rest = divmod(n, 20)
+    if rest == 0:
+        return f"მე{SCORE_STEMS[score]}ე"
+    return f"{SCORE_STEMS[score]}და{'მე' + _ordinal_stem(rest) + 'ე'}"
+
+
+# Ordinal words and their short forms ("პირველ წიგნში") mapped to the canonical word used in metadata
+ORDINAL_WORDS = {}
+for _n in range(1, 100):
+    _word = georgian_ordinal(_n)
+    ORDINAL_WORDS[_word] = _word
+    if _word.endswith("ი"):
+        ORDINAL_WORDS[_word[:-1]] = _word
+
+ORDINAL = r"(?:მე-)?\d+(?:-ე|-ლი)?|[IVXLC]+|[ა-ჰ]+"
+
+
+def _marker_patterns(keyword, suffixes):
+    # "წიგნი მესამე" (as in the code's headings) is checked before "მესამე წიგნში"
+    return (
+        re.compile(rf"{keyword}ი\s+({ORDINAL})(?![\w-])"),
+        re.compile(rf"(?<![\w-])({ORDINAL})\s+{keyword}(?:{suffixes})(?!\w)"),
+    )
+
+
+BOOK_PATTERNS = _marker_patterns("წიგნ", "ი|ის|ში|იდან|ით|ზე")
+CHAPTER_PATTERNS = _marker_patterns("თავ", "ი|ის|ში|იდან|ით|ზე")
+
+
+def _roman_to_int(text):
+    total = 0
+    for i, char in enumerate(text):
+        value = ROMAN_VALUES[char]
+        if i + 1 < len(text) and ROMAN_VALUES[text[i + 1]] > value:
+            total -= value
+        else:
+            total += value
+    return total
+
+
+def _canonical_ordinal(token):
+    """„მე-3“, „3-ე“, „III“, „მესამე“ ან „მესამეში“ → „მესამე“; უცნობი სიტყვისთვის None."""
+    digits = re.sub(r"^მე-|-ე$|-ლი$", "", token)
+    if digits.isdigit():
+        n = int(digits)
+        return georgian_ordinal(n) if 0 < n < 100 else None
+    if re.fullmatch(r"[IVXLC]+", token):
+        n = _roman_to_int(token)
+        return georgian_ordinal(n) if 0 < n < 100 else None
+    return ORDINAL_WORDS.get(token)
+
+
+def normalize_article_number(number):
+    """„12^1“ (როგორც მომხმარებლები წერენ) → „12¹“ (როგორც მეტამონაცემებშია)."""
+    if "^" in number:
+        base, upper = number.split("^", 1)
+        return base + upper.translate(TO_SUPERSCRIPT)
+    return number
+
+
+class QueryScope:
+    """
+    შეკითხვიდან ამოღებული სტრუქტურული მითითებები: მუხლების ნომრები, წიგნი და თავი (მეტამონაცემების ფორმატით).
+    თავი მხოლოდ წიგნის ფარგლებში ცალსახაა, ამიტომ chapter მოითხოვს book-ს.
+    """
+
+    def __init__(self, article_numbers=(), book=None, chapter=None):
+        if chapter is not None and book is None:
+            raise ValueError("a chapter scope needs a book: chapters are numbered per book")
+        self.article_numbers = list(article_numbers)
+        self.book = book
+        self.chapter = chapter
+
+    @property
+    def has_filter(self):
+        return self.book is not None or self.chapter is not None
+
+    def where(self):
+        """Chroma-ს where ფილტრი ან None."""
+        conditions = []
+        if self.book is not None:
+            conditions.append({"book": self.book})
+        if self.chapter is not None:
+            conditions.append({"chapter": self.chapter})
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    def filter_key(self):
+        return (self.book, self.chapter)
+
+    def __repr__(self):
+        return f"QueryScope(article_numbers={self.article_numbers}, book={self.book!r}, chapter={self.chapter!r})"
+
+
+class ArticleIndex:
+    """
+    ფრაგმენტების მეტამონაცემებზე (article_number, book, chapter, sub_chunk_seq) აგებული მეხსიერებაში არსებული ინდექსი.
+    lookup_articles მუხლის ნომრით ფრაგმენტებს O(1)-ში პოულობს, ემბედინგისა და ვექტორული ძიების გარეშე;
+    parse_query შეკითხვაში პოულობს მუხლების, წიგნებისა და თავების მითითებებს;
+    candidates აბრუნებს წიგნის/თავის ფრაგმენტების პოზიციებს BM25 ძიების შესაზღუდად.
+    """
+
+    def __init__(self, chunks):
+        self.documents = [chunk['text'] for chunk in chunks]
+        self._articles = {}
+        self._scopes = {}
+        # Chapter numbering restarts in every book: chapter -> books that contain it
+        self._chapter_books = {}
+        for position, chunk in enumerate(chunks):
+            metadata = chunk['metadata']
+            self._articles.setdefault(metadata['article_number'], []).append(position)
+            book, chapter = metadata.get('book'), metadata.get('chapter')
+            for key in ((book, None), (book, chapter)):
+                self._scopes.setdefault(key, []).append(position)
+            self._chapter_books.setdefault(chapter, set()).add(book)
+
+        # Article parts in their original order
+        for article_number, positions in self._articles.items():
+            positions.sort(key=lambda position: chunks[position]['metadata'].get('sub_chunk_seq', 0))
+        self._scopes = {key: np.array(positions, dtype=np.int64) for key, positions in self._scopes.items()}
+
+    def __contains__(self, article_number):
+        return article_number in self._articles
+
+    def lookup_articles(self, article_numbers, limit=None):
+        """
+        მითითებული მუხლების ფრაგმენტების ტექსტები (მუხლებისა და ნაწილების თანმიმდევრობით); უცნობი ნომრები გამოტოვებულია.
+        limit ზღუდავს ფრაგმენტების რაოდენობას: ადგილები მუხლებს შორის რიგრიგობით ნაწილდება, ამიტომ გრძელი მუხლი
+        დანარჩენ მოთხოვნილ მუხლებს არ განდევნის და თითოეულიდან ბრუნდება მისი პირველი ნაწილები.
+        """
+        articles = [self._articles[number] for number in dict.fromkeys(article_numbers) if number in self._articles]
+        if limit is not None:
+            taken = [0] * len(articles)
+            remaining = min(limit, sum(len(positions) for positions in articles))
+            while remaining > 0:
+                for i, positions in enumerate(articles):
+                    if remaining > 0 and taken[i] < len(positions):
+                        taken[i] += 1
+                        remaining -= 1
+            articles = [positions[:n] for positions, n in zip(articles, taken)]
+        return [self.documents[position] for positions in articles for position in positions]
+
+    def candidates(self, scope):
+        """წიგნისა და/ან თავის ფრაგმენტების პოზიციები ან None, თუ ფილტრი არ არის მითითებული."""
+        if not scope.has_filter:
+            return None
+        return self._scopes.get(scope.filter_key(), np.array([], dtype=np.int64))
+
+    def _find_marker(self, query, patterns, prefix):
+        for pattern in patterns:
+            for match in pattern.finditer(query):
+                ordinal = _canonical_ordinal(match.group(1))
+                if ordinal is None:
+                    continue
+                value = f"{prefix} {ordinal}"
+                known = value in self._chapter_books if prefix == "თავი" else (value, None) in self._scopes
+                if known:
+                    yield value
+
+    def _scope_book_and_chapter(self, query):
+        book = next(self._find_marker(query, BOOK_PATTERNS, "წიგნი"), None)
+        for chapter in self._find_marker(query, CHAPTER_PATTERNS, "თავი"):
+            books = self._chapter_books[chapter]
+            if book is None and len(books) == 1:
+                # The chapter occurs in a single book, so that book is implied
+                book = next(iter(books))
+            if book in books:
+                return book, chapter
+        return book, None
+
+    def parse_query(self, query):
+        """
+        შეკითხვის წინასწარი ანალიზი: „მუხლი 12“, „მე-12 მუხლი“, „მუხლები 12 და 13“ ტიპის მითითებები და
+        „მესამე წიგნი“, „წიგნი III“, „მეორე თავში“ ტიპის ფარგლები. აბრუნებს QueryScope-ს მხოლოდ კორპუსში არსებული მნიშვნელობებით.
+        თავების ნუმერაცია ყოველ წიგნში თავიდან იწყება, ამიტომ თავი ფილტრად გამოიყენება მხოლოდ წიგნთან ერთად: წიგნი ან
+        მითითებულია შეკითხვაში, ან გამოიყვანება, თუ ეს თავი მხოლოდ ერთ წიგნშია; წინააღმდეგ შემთხვევაში თავი იგნორირდება.
+        """
+        article_numbers = []
+        for pattern in (ARTICLE_AFTER_PATTERN, ARTICLE_BEFORE_PATTERN):
+            for match in pattern.finditer(query):
+                for number in ARTICLE_NUMBER_PATTERN.findall(match.group(1)):
+                    number = normalize_article_number(number)
+                    if number in self._articles and number not in article_numbers:
+                        article_numbers.append(number)
+
+        book, chapter = self._scope_book_and_chapter(query)
+        return QueryScope(article_numbers, book, chapter)
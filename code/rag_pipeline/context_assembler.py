@@ -0,0 +1,126 @@
+import os
+import math
+from core.bulk_embedding import EMBED_CHARS_PER_TOKEN
+
+# Same rough Georgian estimate as ingestion; override with CONTEXT_CHARS_PER_TOKEN after checking usage stats
+DEFAULT_CHARS_PER_TOKEN = EMBED_CHARS_PER_TOKEN
+DEFAULT_TOKEN_BUDGET = 3000
+GAP_MARKER = "…"
+
+
+class AssembledContext:
+    """LLM-ისთვის აწყობილი კონტექსტი: ტექსტი, ციტირების რუკა, გამოყენებული ფრაგმენტების id-ები და ტოკენების შეფასება."""
+
+    def __init__(self, text, citations, chunk_ids, tokens):
+        self.text = text
+        self.citations = citations
+        self.chunk_ids = chunk_ids
+        self.tokens = tokens
+
+    def article_numbers(self):
+        return [citation["article_number"] for citation in self.citations]
+
+
+def _split_chunk(hit):
+    """ფრაგმენტის ტექსტს ყოფს სათაურად („მუხლი N. სათაური“) და შინაარსად; „(ნაწილი K)“ სათაურს აღარ ემატება."""
+    metadata = hit.get("metadata") or {}
+    text = hit["text"]
+    if "article_number" not in metadata:
+        return None, text.strip()
+    header = f"მუხლი {metadata['article_number']}. {metadata.get('article_title', '')}".rstrip()
+    if text.startswith(f"მუხლი {metadata['article_number']}."):
+        _, _, body = text.partition("\n\n")
+        return header, body.strip()
+    return header, text.strip()
+
+
+class ContextAssembler:
+    """
+    ძიებასა და answer_question-ს შორის მდგომი ეტაპი. მოძიებულ ფრაგმენტებს (hits: id, text, score, metadata)
+    აჯგუფებს მუხლის ნომრით (article_number), ერთი მუხლის ნაწილებს (sub_chunk_seq) ალაგებს და აერთიანებს ერთი სათაურით,
+    შემდეგ მუხლებს ქულების კლებადობით ხარბად ათავსებს token_budget-ის ფარგლებში. მუხლი, რომელიც მთლიანად არ ეტევა,
+    მისი ყველაზე მაღალი ქულის მქონე ნაწილებით ემატება. აბრუნებს AssembledContext-ს კომპაქტური ციტირების რუკით.
+    """
+
+    def __init__(self, token_budget=None, chars_per_token=None):
+        # An explicit 0 is kept; only None falls back to the environment
+        self.token_budget = (
+            token_budget if token_budget is not None
+            else int(os.getenv("CONTEXT_TOKEN_BUDGET", str(DEFAULT_TOKEN_BUDGET)))
+        )
+        self.chars_per_token = chars_per_token or float(
+            os.getenv("CONTEXT_CHARS_PER_TOKEN", str(DEFAULT_CHARS_PER_TOKEN))
+        )
+
+    def estimate_tokens(self, text):
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def _group(self, hits):
+        """article_number → მუხლის ნაწილები; ჯგუფის ქულა მისი საუკეთესო ნაწილის ქულაა."""
+        groups = {}
+        for rank, hit in enumerate(hits):
+            metadata = hit.get("metadata") or {}
+            key = metadata.get("article_number", hit.get("id") or f"hit_{rank}")
+            group = groups.setdefault(key, {"key": key, "metadata": metadata, "parts": {}, "score": hit["score"], "rank": rank})
+            header, body = _split_chunk(hit)
+            group["header"] = header
+            seq = metadata.get("sub_chunk_seq", 0)
+            # The same part can come from several retrievers; keep its best score
+            if seq not in group["parts"] or hit["score"] > group["parts"][seq]["score"]:
+                group["parts"][seq] = {"id": hit.get("id"), "body": body, "score": hit["score"]}
+            group["score"] = max(group["score"], hit["score"])
+        return sorted(groups.values(), key=lambda group: (-group["score"], group["rank"]))
+
+    @staticmethod
+    def _render(header, parts):
+        """ნაწილები sub_chunk_seq-ის მიხედვით; მეზობელი ნაწილები პირდაპირ ერთდება, გამოტოვებული ნაწილის ადგილას კი „…“ იწერება."""
+        lines = [header] if header else []
+        previous = None
+        for seq in sorted(parts):
+            if previous is not None and seq != previous + 1:
+                lines.append(GAP_MARKER)
+            lines.append(parts[seq]["body"])
+            previous = seq
+        return "\n".join(lines)
+
+    def _fit(self, group, remaining):
+        """მუხლის ის ნაწილები, რომლებიც remaining ტოკენში ეტევა (ჯერ მთლიანი მუხლი, შემდეგ ნაწილები ქულების მიხედვით)."""
+        parts = group["parts"]
+        if self.estimate_tokens(self._render(group["header"], parts)) <= remaining:
+            return parts
+        chosen = {}
+        for seq in sorted(parts, key=lambda seq: -parts[seq]["score"]):
+            candidate = {**chosen, seq: parts[seq]}
+            if self.estimate_tokens(self._render(group["header"], candidate)) <= remaining:
+                chosen = candidate
+        return chosen
+
+    def assemble(self, hits):
+        blocks, citations, chunk_ids = [], [], []
+        used = 0
+        for group in self._group(hits):
+            # Blocks are separated by a blank line, which also counts against the budget
+            separator = self.estimate_tokens("\n\n") if blocks else 0
+            parts = self._fit(group, self.token_budget - used - separator)
+            if not parts and not blocks and self.token_budget > 0:
+                # Even the best part alone is over budget: send it truncated rather than an empty context
+                seq = max(group["parts"], key=lambda seq: group["parts"][seq]["score"])
+                part = group["parts"][seq]
+                limit = int(self.token_budget * self.chars_per_token) - len(group["header"] or "") - 1
+                parts = {seq: {**part, "body": part["body"][:max(limit, 0)]}}
+            if not parts:
+                continue
+
+            block = self._render(group["header"], parts)
+            blocks.append(block)
+            used += separator + self.estimate_tokens(block)
+            metadata = group["metadata"]
+            citations.append({
+                "article_number": metadata.get("article_number", group["key"]),
+                "article_title": metadata.get("article_title"),
+                "chunk_ids": [parts[seq]["id"] for seq in sorted(parts)],
+                "score": round(group["score"], 4),
+            })
+            chunk_ids.extend(parts[seq]["id"] for seq in sorted(parts))
+
+        return AssembledContext("\n\n".join(blocks), citations, chunk_ids, used)
@@ -0,0 +1,71 @@
+import os
+
+# "rerank" (cosine rerank over the precomputed chunk matrix), "rrf" or "weighted"
+FUSION_MODES = ("rerank", "rrf", "weighted")
+DEFAULT_RRF_K = 60
+
+
+def reciprocal_rank_fusion(ranked_lists, weights=None, k=DEFAULT_RRF_K):
+    """
+    Reciprocal Rank Fusion: თითოეული სიიდან ელემენტი იღებს weight / (k + rank) ქულას, სადაც rank 1-დან იწყება.
+    ranked_lists — [(key, score), ...] სიები კლებადობით; ქულები აქ მხოლოდ რიგითობისთვის გამოიყენება.
+    """
+    weights = weights or [1.0] * len(ranked_lists)
+    fused = {}
+    for ranked, weight in zip(ranked_lists, weights):
+        for rank, (key, _) in enumerate(ranked, start=1):
+            fused[key] = fused.get(key, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+
+def _min_max(scored):
+    if not scored:
+        return {}
+    values = [score for _, score in scored]
+    low, high = min(values), max(values)
+    if high == low:
+        return {key: 1.0 for key, _ in scored}
+    return {key: (score - low) / (high - low) for key, score in scored}
+
+
+def weighted_score_fusion(scored_lists, weights=None):
+    """
+    თითოეული სიის ქულები min-max ნორმალიზაციით [0, 1] შუალედში გადაიყვანება და შეიკრიბება წონებით.
+    ელემენტი, რომელიც სიაში არ არის, ამ სიიდან 0 ქულას იღებს.
+    """
+    weights = weights or [1.0] * len(scored_lists)
+    fused = {}
+    for scored, weight in zip(scored_lists, weights):
+        for key, score in _min_max(scored).items():
+            fused[key] = fused.get(key, 0.0) + weight * score
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+
+class FusionEngine:
+    """
+    dense და sparse შედეგების გაერთიანების სტრატეგია, რომელიც კონფიგურაციით (FUSION_MODE, FUSION_DENSE_WEIGHT,
+    FUSION_SPARSE_WEIGHT, FUSION_RRF_K) ან პარამეტრებით ირჩევა.
+    "rerank" — კანდიდატები ფასდება კოსინუსური მსგავსებით ChunkEmbeddingMatrix-ით (ნაგულისხმევი);
+    "rrf" და "weighted" — იყენებს მხოლოდ იმ ქულებს, რომლებიც Chroma-მ (distances) და BM25-მა უკვე დაითვალეს.
+    """
+
+    def __init__(self, mode=None, dense_weight=None, sparse_weight=None, rrf_k=None):
+        self.mode = mode or os.getenv("FUSION_MODE", "rerank")
+        if self.mode not in FUSION_MODES:
+            raise ValueError(f"unknown fusion mode: {self.mode} (expected one of {', '.join(FUSION_MODES)})")
+        self.dense_weight = dense_weight if dense_weight is not None else float(os.getenv("FUSION_DENSE_WEIGHT", "1.0"))
+        self.sparse_weight = sparse_weight if sparse_weight is not None else float(os.getenv("FUSION_SPARSE_WEIGHT", "1.0"))
+        self.rrf_k = rrf_k or int(os.getenv("FUSION_RRF_K", str(DEFAULT_RRF_K)))
+
+    @property
+    def uses_reranker(self):
+        return self.mode == "rerank"
+
+    def fuse(self, dense, sparse, top_k):
+        """dense/sparse: [(chunk_id, score), ...] კლებადობით (dense ქულა = -distance). აბრუნებს top_k (chunk_id, score) წყვილს."""
+        weights = [self.dense_weight, self.sparse_weight]
+        if self.mode == "rrf":
+            fused = reciprocal_rank_fusion([dense, sparse], weights, k=self.rrf_k)
+        else:
+            fused = weighted_score_fusion([dense, sparse], weights)
+        return fused[:top_k]
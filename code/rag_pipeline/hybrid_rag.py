@@ -1,72 +1,238 @@
-from rag_pipeline.sparse_retriever import SparseRetriever
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from rag_pipeline.sparse_retriever import SparseRetriever, SPARSE_INDEX_FILE
+from rag_pipeline.reranker import ChunkEmbeddingMatrix, EMBEDDINGS_FILE, EMBEDDINGS_META_FILE
+from rag_pipeline.article_index import ArticleIndex
+from rag_pipeline.fusion import FusionEngine
 from core.embeddings import GeminiEmbeddingFunction
-import numpy as np
-
-def _normalize_emb(x):
-    """Convert numpy arrays -> python lists; leave lists as-is."""
-    if hasattr(x, "tolist"):
-        return x.tolist()
-    return x
-
-def _cosine_similarity(a, b):
-    a = np.array(a, dtype=float)
-    b = np.array(b, dtype=float)
-    na = np.linalg.norm(a)
-    nb = np.linalg.norm(b)
-    if na == 0 or nb == 0:
-        return 0.0
-    return float(np.dot(a, b) / (na * nb))
-
-def rerank_chunks(query, chunk_texts, emb_lookup, embedding_model=GeminiEmbeddingFunction(), query_emb=None):
-    # Reuse query_emb if provided
-    if query_emb is None:
-        query_emb = embedding_model([query])[0]
-    query_emb = _normalize_emb(query_emb)
-
-    scores = []
-    for text in chunk_texts:
-        chunk_emb = emb_lookup.get(text)
-        if chunk_emb is None:
-            chunk_emb = embedding_model([text])[0]
-        chunk_emb = _normalize_emb(chunk_emb)
-        score = _cosine_similarity(query_emb, chunk_emb)
-        scores.append((score, text))
-
-    ranked = [c for _, c in sorted(scores, key=lambda x: x[0], reverse=True)]
-    return ranked
+from processing.data_processing import chunks_fingerprint
+from core.tracing import span, count
+from core.concurrency import SingleFlight, ConcurrencyLimiter
+
+# Per-process cap on concurrent retrievals (each one embeds, queries Chroma and scores BM25); 0 disables it
+RETRIEVE_MAX_CONCURRENCY = int(os.getenv("RETRIEVE_MAX_CONCURRENCY", "16"))
+
 
 class HybridRAG:
-    def __init__(self, collection, chunks, top_k_dense=10, top_k_sparse=10):
+    """
+    ჰიბრიდული (dense + BM25) ძიება, რომელიც ერთი ინსტანციით ზიარდება ყველა სესიასა და თრედს შორის.
+    აგების შემდეგ ინდექსები მხოლოდ იკითხება (BM25 CSR მასივები, ემბედინგების მატრიცა, ArticleIndex), ხოლო გაზიარებული
+    მდგომარეობა (ემბედინგების ქეში, Gemini კლიენტი, მეტრიკები) დაცულია lock-ებით, ამიტომ ერთდროული გამოძახებები უსაფრთხოა.
+    იდენტური შეკითხვების ერთდროული retrieve_hits გამოძახებები ერთ გამოთვლას ელოდება (single-flight),
+    ერთდროული ძიებების რაოდენობა კი RETRIEVE_MAX_CONCURRENCY-ით იზღუდება.
+    """
+
+    def __init__(self, collection, chunks, top_k_dense=10, top_k_sparse=10, top_k=5, max_workers=4,
+                 embedding_model=None, index_dir=None, sparse=None, reranker=None, fusion=None):
+        # index_dir redirects the on-disk sparse index and embedding matrix (e.g. for benchmarks);
+        # sparse/reranker accept prebuilt components, e.g. from the memory-mapped index bundle;
+        # fusion is a FusionEngine or a mode name ("rerank", "rrf", "weighted")
+        def index_file(default):
+            return os.path.join(index_dir, os.path.basename(default)) if index_dir else default
+
         self.collection = collection
-        self.sparse = SparseRetriever(chunks)
+        self.corpus_version = chunks_fingerprint(chunks)
+        self._chunks_by_text = {chunk['text']: chunk for chunk in chunks}
+        self._chunks_by_id = {chunk['id']: chunk for chunk in chunks}
+        self._ids = [chunk['id'] for chunk in chunks]
+        self.sparse = sparse or SparseRetriever(chunks, index_path=index_file(SPARSE_INDEX_FILE))
+        # Article/book/chapter metadata: direct article lookups and scoped searches
+        self.article_index = ArticleIndex(chunks)
         self.top_k_dense = top_k_dense
         self.top_k_sparse = top_k_sparse
-        self.embedding_model = GeminiEmbeddingFunction()
+        self.top_k = top_k
+        self.fusion = fusion if isinstance(fusion, FusionEngine) else FusionEngine(fusion)
+        self.embedding_model = embedding_model or GeminiEmbeddingFunction()
+        # Precomputed chunk embeddings; reranking needs no Chroma payload or extra API calls
+        self.reranker = reranker or ChunkEmbeddingMatrix.load_or_build(
+            chunks, collection, self.embedding_model,
+            path=index_file(EMBEDDINGS_FILE), meta_path=index_file(EMBEDDINGS_META_FILE)
+        )
+        # BM25 does not depend on the query embedding, so it runs alongside the network round trips
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hybrid-rag")
+        self._in_flight = SingleFlight("retrieve")
+        self._limiter = ConcurrencyLimiter("retrieve", RETRIEVE_MAX_CONCURRENCY)
+
+    def chunk_ids(self, texts):
+        """მოძიებული ტექსტების შესაბამისი ფრაგმენტების id-ები (უცნობი ტექსტებისთვის — None)."""
+        return [self._chunks_by_text[text]['id'] if text in self._chunks_by_text else None for text in texts]
+
+    def _hits(self, scored_texts):
+        """(text, score) წყვილები → hits: id, text, score და metadata (ContextAssembler-ისთვის)."""
+        hits = []
+        for text, score in scored_texts:
+            chunk = self._chunks_by_text.get(text, {})
+            hits.append({"id": chunk.get('id'), "text": text, "score": score, "metadata": chunk.get('metadata', {})})
+        return hits
+
+    def _hits_by_id(self, scored_ids):
+        return [
+            {"id": chunk_id, "text": chunk['text'], "score": score, "metadata": chunk['metadata']}
+            for chunk_id, score in scored_ids
+            if (chunk := self._chunks_by_id.get(chunk_id)) is not None
+        ]
+
+    def _submit(self, fn, *args):
+        # Run in a copy of the caller's context so spans land in the caller's trace
+        return self._executor.submit(contextvars.copy_context().run, fn, *args)
+
+    def _dense_search(self, query_embs, where=None):
+        """აბრუნებს თითოეული შეკითხვისთვის (chunk_id, -distance) წყვილებს; დოკუმენტების ტექსტი Chroma-დან აღარ გადმოიცემა."""
+        with span("dense_query", queries=len(query_embs), filtered=where is not None) as attrs:
+            dense_results = self.collection.query(
+                query_embeddings=query_embs,
+                n_results=self.top_k_dense,
+                where=where,
+                include=['distances']
+            )
+            ids = dense_results.get("ids") or [[] for _ in query_embs]
+            distances = dense_results.get("distances") or [[] for _ in query_embs]
+            results = [
+                [
+                    (chunk_id, -float(distance))
+                    for chunk_id, distance in zip(query_ids, query_distances)
+                    if chunk_id in self._chunks_by_id
+                ]
+                for query_ids, query_distances in zip(ids, distances)
+            ]
+            attrs["candidates"] = sum(len(scored) for scored in results)
+            unmapped = sum(len(query_ids) for query_ids in ids) - attrs["candidates"]
+            if unmapped:
+                # The collection is out of sync with the chunks (see load_data)
+                attrs["unmapped"] = unmapped
+                count("dense_unmapped", unmapped)
+        return results
+
+    def _sparse_search_many(self, queries, scopes):
+        """აბრუნებს თითოეული შეკითხვისთვის (chunk_id, BM25 ქულა) წყვილებს."""
+        with span("sparse_search", queries=len(queries)) as attrs:
+            results = [
+                [
+                    (self._ids[position], score)
+                    for position, score in self.sparse.search_scored(
+                        query, top_k=self.top_k_sparse, candidates=self.article_index.candidates(scope)
+                    )
+                ]
+                for query, scope in zip(queries, scopes)
+            ]
+            attrs["candidates"] = sum(len(scored) for scored in results)
+        return results
+
+    def _merge_and_rerank(self, query_emb, dense, sparse):
+        """აერთიანებს dense და sparse კანდიდატებს fusion რეჟიმის მიხედვით და აბრუნებს top_k hits-ს."""
+        if not self.fusion.uses_reranker:
+            with span("fusion", mode=self.fusion.mode, candidates=len(dense) + len(sparse)):
+                return self._hits_by_id(self.fusion.fuse(dense, sparse, self.top_k))
+
+        combined_docs = [
+            self._chunks_by_id[chunk_id]['text']
+            for chunk_id in dict.fromkeys(chunk_id for chunk_id, _ in dense + sparse)
+            if chunk_id in self._chunks_by_id
+        ]
+        with span("rerank", candidates=len(combined_docs)):
+            ranked = self.reranker.rerank(query_emb, combined_docs, top_k=self.top_k,
+                                          embedding_model=self.embedding_model)
+        return self._hits(ranked)
+
+    def _lookup_articles(self, scope):
+        with span("article_lookup", articles=len(scope.article_numbers)):
+            count("article_direct_hits")
+            # Explicitly requested articles outrank everything else; top_k is shared between them
+            texts = self.article_index.lookup_articles(scope.article_numbers, limit=self.top_k)
+            return self._hits((text, 1.0) for text in texts)
+
+    def answer_cache_embedding(self, query):
+        """
+        შეკითხვის ემბედინგი პასუხების ქეშის სემანტიკური ძიებისთვის (ძიების შემდეგ ის უკვე ემბედინგების ქეშშია).
+        მუხლზე პირდაპირი მითითებისას ძიება ემბედინგს არ იყენებს, ამიტომ ბრუნდება None და ქეში მხოლოდ ზუსტ დამთხვევას
+        ამოწმებს — ასე ეს შეკითხვები ემბედინგის API-ს საერთოდ არ მიმართავენ.
+        """
+        if self.article_index.parse_query(query).article_numbers:
+            return None
+        return self.embedding_model.embed_query(query)
 
     def retrieve(self, query):
-        # compute query embedding once and pass it to Chroma
-        query_emb = self.embedding_model([query])[0]
+        """აბრუნებს მოძიებული ფრაგმენტების ტექსტებს (იხ. retrieve_hits)."""
+        return [hit["text"] for hit in self.retrieve_hits(query)]
 
-        dense_results = self.collection.query(
-            query_embeddings=[query_emb],
-            n_results=self.top_k_dense,
-            include=['documents', 'embeddings']
-        )
+    def retrieve_many(self, queries):
+        """retrieve-ის batch ვერსია (იხ. retrieve_many_hits)."""
+        return [[hit["text"] for hit in hits] for hits in self.retrieve_many_hits(queries)]
+
+    def retrieve_hits(self, query):
+        """
+        ჰიბრიდული ძიება, რომელიც აბრუნებს hits-ს (id, text, score, metadata) ქულების კლებადობით.
+        თუ შეკითხვა პირდაპირ მიუთითებს მუხლ(ებ)ზე (მაგ., „მუხლი 12“), ბრუნდება ამ მუხლების ფრაგმენტები API გამოძახების გარეშე
+        (სულ არაუმეტეს top_k, მუხლებს შორის თანაბრად განაწილებით);
+        წიგნის/თავის მითითება ზღუდავს როგორც Chroma-ს (where ფილტრით), ისე BM25 ძიებას. თავი ფილტრავს მხოლოდ თავისი წიგნის
+        ფარგლებში (იხ. ArticleIndex.parse_query).
+        დაბრუნებული hits შესაძლოა ზიარდებოდეს ერთდროულ გამომძახებლებს შორის, ამიტომ მათი შეცვლა არ შეიძლება.
+        """
+        return self._in_flight.do(query, self._retrieve_hits, query)[0]
+
+    def _retrieve_hits(self, query):
+        with self._limiter.slot(), span("retrieve"):
+            scope = self.article_index.parse_query(query)
+            if scope.article_numbers:
+                return self._lookup_articles(scope)
+
+            sparse_future = self._submit(self._sparse_search_many, [query], [scope])
+
+            # compute query embedding once and pass it to Chroma
+            with span("embed_query"):
+                query_emb = self.embedding_model([query])[0]
+            dense = self._dense_search([query_emb], scope.where())[0]
+
+            return self._merge_and_rerank(query_emb, dense, sparse_future.result()[0])
+
+    def retrieve_many_hits(self, queries):
+        """
+        რამდენიმე შეკითხვის ერთდროული ძიება: ყველა შეკითხვა ემბედდება ერთი batch გამოძახებით და Chroma-ს ეგზავნება
+        ერთი multi-embedding query-ით (თითო where ფილტრზე), BM25 ძიება კი პარალელურად მიმდინარეობს.
+        მუხლზე პირდაპირი მითითების მქონე შეკითხვები ემბედინგის გარეშე წყდება. აბრუნებს შედეგების სიას შეკითხვების თანმიმდევრობით.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+
+        # Identical queries in one batch are retrieved once
+        unique = list(dict.fromkeys(queries))
+        if len(unique) < len(queries):
+            count("retrieve_coalesced", len(queries) - len(unique))
+            by_query = dict(zip(unique, self.retrieve_many_hits(unique)))
+            return [by_query[query] for query in queries]
 
-        dense_docs = dense_results.get("documents", [[]])[0]
-        dense_embs = dense_results.get("embeddings", [[]])[0]
+        with self._limiter.slot(), span("retrieve_many", queries=len(queries)):
+            scopes = [self.article_index.parse_query(query) for query in queries]
+            results = [None] * len(queries)
+            pending = []
+            for i, scope in enumerate(scopes):
+                if scope.article_numbers:
+                    results[i] = self._lookup_articles(scope)
+                else:
+                    pending.append(i)
+            if not pending:
+                return results
 
-        # Normalize numpy -> list (Chroma may return numpy arrays on cloud)
-        if hasattr(dense_embs, "tolist"):
-            dense_embs = dense_embs.tolist()
+            pending_queries = [queries[i] for i in pending]
+            pending_scopes = [scopes[i] for i in pending]
+            sparse_future = self._submit(self._sparse_search_many, pending_queries, pending_scopes)
 
-        # Fallback: if embeddings are missing or not in expected structure
-        if len(dense_embs) == 0 or isinstance(dense_embs[0], float):
-            dense_embs = self.embedding_model(dense_docs)
+            with span("embed_query", queries=len(pending)):
+                query_embs = self.embedding_model(pending_queries)
 
-        sparse_docs = self.sparse.search(query, top_k=self.top_k_sparse)
-        combined_docs = list(dict.fromkeys(dense_docs + sparse_docs))
-        emb_lookup = {doc: emb for doc, emb in zip(dense_docs, dense_embs)}
+            # One Chroma query per distinct filter
+            groups = {}
+            for j, scope in enumerate(pending_scopes):
+                groups.setdefault(scope.filter_key(), []).append(j)
+            dense = [None] * len(pending)
+            for members in groups.values():
+                where = pending_scopes[members[0]].where()
+                for j, scored in zip(members, self._dense_search([query_embs[j] for j in members], where)):
+                    dense[j] = scored
+            sparse = sparse_future.result()
 
-        ranked = rerank_chunks(query, combined_docs, emb_lookup, self.embedding_model, query_emb)
-        return ranked[:5]
+            for j, i in enumerate(pending):
+                results[i] = self._merge_and_rerank(query_embs[j], dense[j], sparse[j])
+            return results
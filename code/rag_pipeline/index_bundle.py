@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import shutil
+import numpy as np
+from processing.data_processing import chunks_fingerprint, saved_chunks_fingerprint, CHUNKS_FILE
+from rag_pipeline.sparse_retriever import SparseRetriever
+from rag_pipeline.reranker import ChunkEmbeddingMatrix
+
+BUNDLE_DIR = "./data/index_bundle"
+BUNDLE_FORMAT = 1
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 2
+
+SPARSE_ARRAYS = ("indptr", "doc_ids", "weights", "idf")
+
+
+class IndexBundle:
+    """ჩატვირთული ბანდლი: ფრაგმენტები, BM25 ინდექსი, ემბედინგების მატრიცა და მანიფესტი."""
+
+    def __init__(self, path, manifest, chunks, sparse, reranker):
+        self.path = path
+        self.manifest = manifest
+        self.chunks = chunks
+        self.sparse = sparse
+        self.reranker = reranker
+
+    @property
+    def version(self):
+        return self.manifest["version"]
+
+
+def _file_signature(path):
+    """ფაილის ზომა და ცვლილების დრო — იაფი შემოწმება, ხომ არ შეცვლილა ის ბანდლის აგების შემდეგ; None, თუ ფაილი არ არსებობს."""
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def build_bundle(chunks, collection, embedding_model, bundle_dir=BUNDLE_DIR, chunks_path=CHUNKS_FILE):
+    """
+    ოფლაინ აგების ნაბიჯი: წერს ერთ ვერსიონირებულ ბანდლს (ფრაგმენტების ტექსტები და მეტამონაცემები, BM25 ინდექსის მასივები,
+    ემბედინგების მატრიცა) დირექტორიაში bundle_dir/<ვერსია>/ და ატომურად ანაცვლებს CURRENT მაჩვენებელს.
+    ყველა რიცხვითი მასივი ინახება ცალკე .npy ფაილად, რათა აპლიკაციამ ისინი memmap-ით ჩატვირთოს.
+    """
+    fingerprint = chunks_fingerprint(chunks)
+    version = fingerprint[:12]
+    target = os.path.join(bundle_dir, version)
+    tmp = target + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    # Chunk texts as one UTF-8 blob plus byte offsets
+    encoded = [chunk['text'].encode("utf-8") for chunk in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(text) for text in encoded])
+    with open(os.path.join(tmp, "texts.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(tmp, "text_offsets.npy"), offsets)
+    with open(os.path.join(tmp, "chunks_meta.json"), "w", encoding="utf-8") as f:
+        json.dump([{"id": chunk['id'], "metadata": chunk['metadata']} for chunk in chunks], f, ensure_ascii=False)
+
+    sparse = SparseRetriever(chunks, index_path=None)
+    arrays = sparse.arrays()
+    for name in SPARSE_ARRAYS:
+        np.save(os.path.join(tmp, f"sparse_{name}.npy"), arrays[name])
+    with open(os.path.join(tmp, "sparse_vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(arrays["vocab"], f, ensure_ascii=False)
+
+    matrix = ChunkEmbeddingMatrix._collect_embeddings(chunks, collection, embedding_model)
+    np.save(os.path.join(tmp, "embeddings.npy"), matrix)
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "chunks_fingerprint": fingerprint,
+        # Lets load_bundle skip re-reading chunks.jsonl while it is unchanged since ingestion
+        "chunks_file": _file_signature(chunks_path),
+        "created_at": time.time(),
+        "chunk_count": len(chunks),
+        "embedding_model": embedding_model.name(),
+        "embedding_dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "sparse_params": {"k1": sparse.k1, "b": sparse.b},
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    current_tmp = os.path.join(bundle_dir, CURRENT_FILE + ".tmp")
+    with open(current_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(current_tmp, os.path.join(bundle_dir, CURRENT_FILE))
+
+    _prune(bundle_dir, keep=version)
+    print(f"✅ Built index bundle {version} ({len(chunks)} chunks) in {target}")
+    return target
+
+
+def _prune(bundle_dir, keep):
+    versions = [
+        entry for entry in os.listdir(bundle_dir)
+        if os.path.isdir(os.path.join(bundle_dir, entry)) and not entry.endswith(".tmp")
+    ]
+    versions.sort(key=lambda entry: os.path.getmtime(os.path.join(bundle_dir, entry)), reverse=True)
+    for entry in [v for v in versions if v != keep][KEEP_VERSIONS - 1:]:
+        shutil.rmtree(os.path.join(bundle_dir, entry), ignore_errors=True)
+
+
+def load_bundle(embedding_model_name, bundle_dir=BUNDLE_DIR, chunks_path=CHUNKS_FILE):
+    """
+    ტვირთავს CURRENT ბანდლს: ინდექსის მასივები და ემბედინგების მატრიცა memmap-ით იტვირთება, ფრაგმენტების ტექსტები კი
+    texts.bin-იდან ერთხელ დეკოდირდება (HybridRAG-ს ყველა ტექსტი სჭირდება). აბრუნებს None-ს, თუ ბანდლი არ არსებობს,
+    სხვა ფორმატისაა, სხვა ემბედინგის მოდელით არის აგებული ან სხვა ფრაგმენტებიდანაა აგებული, ვიდრე chunks_path
+    (მაგ., ინჯესტია ბანდლის აგებამდე შეწყდა) — ამ შემთხვევაში აპლიკაცია ჩვეულებრივ გზას იყენებს.
+    chunks_path ხელახლა მხოლოდ მაშინ იკითხება, როცა მისი ზომა ან ცვლილების დრო მანიფესტში ჩაწერილს არ ემთხვევა.
+    """
+    current = os.path.join(bundle_dir, CURRENT_FILE)
+    if not os.path.exists(current):
+        return None
+    with open(current, "r", encoding="utf-8") as f:
+        version = f.read().strip()
+    path = os.path.join(bundle_dir, version)
+    manifest_path = os.path.join(path, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != BUNDLE_FORMAT or manifest.get("embedding_model") != embedding_model_name:
+        print("⚠️ Index bundle is outdated, ignoring it")
+        return None
+
+    # Bundles written before the key was renamed store the same hash as "fingerprint"
+    fingerprint = manifest.get("chunks_fingerprint", manifest.get("fingerprint"))
+    # Versions are written atomically and named after the fingerprint, so the directory name is enough to tie them
+    if not fingerprint or manifest.get("version") != version or not fingerprint.startswith(version):
+        print("⚠️ Index bundle does not match its manifest, ignoring it")
+        return None
+    signature = _file_signature(chunks_path)
+    if signature is not None and signature != manifest.get("chunks_file"):
+        if saved_chunks_fingerprint(chunks_path) != fingerprint:
+            print(f"⚠️ Index bundle was built from different chunks than {chunks_path}, ignoring it")
+            return None
+
+    offsets = np.load(os.path.join(path, "text_offsets.npy"))
+    with open(os.path.join(path, "texts.bin"), "rb") as f:
+        blob = f.read()
+    texts = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+    with open(os.path.join(path, "chunks_meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    chunks = [{"id": entry["id"], "text": text, "metadata": entry["metadata"]} for entry, text in zip(meta, texts)]
+
+    with open(os.path.join(path, "sparse_vocab.json"), "r", encoding="utf-8") as f:
+        vocab = json.load(f)
+    sparse_arrays = {name: np.load(os.path.join(path, f"sparse_{name}.npy"), mmap_mode="r") for name in SPARSE_ARRAYS}
+    sparse = SparseRetriever.from_arrays(texts, vocab, **sparse_arrays, **manifest["sparse_params"])
+    reranker = ChunkEmbeddingMatrix(np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r"), chunks)
+
+    print(f"✅ Loaded index bundle {manifest['version']} ({len(chunks)} chunks) from {path}")
+    return IndexBundle(path, manifest, chunks, sparse, reranker)
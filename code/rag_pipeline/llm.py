@@ -1,20 +1,30 @@
 import os
-from google import genai
-import streamlit as st
+import time
+from core.clients import get_genai_client
+from core.tracing import span, count
+from core.concurrency import SingleFlight, ConcurrencyLimiter
+from rag_pipeline.answer_cache import normalize_question
 
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    api_key = st.secrets["GOOGLE_API_KEY"]
-genai_client = genai.Client(api_key=api_key)
+MODEL_NAME = "gemini-2.5-pro"
+# Per-process cap on concurrent generations; extra callers queue (0 disables the cap)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
 
-def answer_question(user_question: str, context: str) -> str:
+# Identical (question, context) generations in flight at the same time share one Gemini call
+_in_flight = SingleFlight("llm")
+_limiter = ConcurrencyLimiter("llm", LLM_MAX_CONCURRENCY)
+
+
+def _flight_key(user_question, context):
+    return normalize_question(user_question), context
+
+
+def build_prompt(user_question: str, context: str) -> str:
     """
-    ეს ფუნქცია იღებს მომხმარებლის კითხვას (user_question) და საქართველოს სამოქალაქო კოდექსის კონტექსტს (context),
-    შემდეგ ქმნის სტრუქტურირებულ მოთხოვნას (prompt) AI მოდელისთვის (gemini-2.5-pro). ფუნქცია უზრუნველყოფს, რომ AI-მ გასცეს ზუსტი,
-    ქართულ ენაზე დაწერილი პასუხი მხოლოდ მოწოდებული კონტექსტის საფუძველზე, სტრუქტურირებული ფორმატით, რომელიც მოიცავს პასუხს და წყაროს ციტირებას
+    ქმნის სტრუქტურირებულ მოთხოვნას (prompt) AI მოდელისთვის მომხმარებლის კითხვისა (user_question) და
+    საქართველოს სამოქალაქო კოდექსის კონტექსტის (context) საფუძველზე.
     """
 
-    prompt = f"""
+    return f"""
     შენ ხარ მაღალკვალიფიციური AI იურიდიული ასისტენტი, საქართველოს სამოქალაქო კოდექსის ექსპერტი. შენი ერთადერთი ფუნქციაა, გასცე ზუსტი და სტრუქტურული პასუხები დასმულ კითხვებზე *მხოლოდ* საქართველოს სამოქალაქო კოდექსის იმ ტექსტზე დაყრდნობით, რომელიც კონტექსტის სახით მოგეწოდება.
 
     შენ მკაცრად უნდა დაიცვა ქვემოთ მოცემული დირექტივები:
@@ -41,9 +51,85 @@ def answer_question(user_question: str, context: str) -> str:
     **მომხმარებლის კითხვა:** {{"{user_question}"}}  
     """
 
-    response = genai_client.models.generate_content(
-        model="gemini-2.5-pro",
-        contents=prompt,
+
+def _record_usage(stats, usage):
+    if stats is None or usage is None:
+        return
+    stats["prompt_tokens"] = getattr(usage, "prompt_token_count", None)
+    stats["output_tokens"] = getattr(usage, "candidates_token_count", None)
+    stats["total_tokens"] = getattr(usage, "total_token_count", None)
+    count("llm_prompt_tokens", stats["prompt_tokens"] or 0)
+    count("llm_output_tokens", stats["output_tokens"] or 0)
+
+
+def answer_question(user_question: str, context: str, stats: dict | None = None, client=None, limiter=None) -> str:
+    """
+    ეს ფუნქცია იღებს მომხმარებლის კითხვას (user_question) და საქართველოს სამოქალაქო კოდექსის კონტექსტს (context),
+    შემდეგ ქმნის სტრუქტურირებულ მოთხოვნას (prompt) AI მოდელისთვის (gemini-2.5-pro). ფუნქცია უზრუნველყოფს, რომ AI-მ გასცეს ზუსტი,
+    ქართულ ენაზე დაწერილი პასუხი მხოლოდ მოწოდებული კონტექსტის საფუძველზე, სტრუქტურირებული ფორმატით, რომელიც მოიცავს პასუხს და წყაროს ციტირებას
+    ერთდროული იდენტური გამოძახებები ერთ გენერაციას ელოდება (stats-ში ასეთ შემთხვევაში იწერება coalesced=True).
+    limiter (ConcurrencyLimiter) ცვლის პროცესის LLM_MAX_CONCURRENCY ლიმიტს, მაგ., ოფლაინ batch დამუშავებისთვის.
+    """
+
+    stats = {} if stats is None else stats
+    answer, shared = _in_flight.do(
+        _flight_key(user_question, context), _generate, user_question, context, stats, client, limiter or _limiter
     )
+    if shared:
+        stats["coalesced"] = True
+    return answer
+
+
+def _generate(user_question, context, stats, client, limiter):
+    client = client or get_genai_client()
+    with limiter.slot(), span("llm.generate", model=MODEL_NAME, context_chars=len(context)) as attrs:
+        started = time.perf_counter()
+        response = client.models.generate_content(
+            model=MODEL_NAME,
+            contents=build_prompt(user_question, context),
+        )
+        count("gemini_generate_calls")
 
+        stats["total_time"] = time.perf_counter() - started
+        _record_usage(stats, getattr(response, "usage_metadata", None))
+        attrs.update(stats)
     return response.text
+
+
+def stream_answer(user_question: str, context: str, stats: dict | None = None, client=None):
+    """
+    answer_question-ის სტრიმინგის ვარიანტი: გენერატორი, რომელიც აბრუნებს პასუხის ტექსტს ნაწილ-ნაწილ, მოდელის მიერ გენერირებისთანავე
+    (გამოიყენება st.write_stream-თან ერთად). თუ stats ლექსიკონი მოწოდებულია, მასში იწერება პირველი ტოკენის დრო (time_to_first_token),
+    გენერაციის სრული დრო (total_time) და ტოკენების რაოდენობა. იმავე კითხვისა და კონტექსტის მიმდინარე სტრიმს
+    ახალი გამომძახებელი უერთდება და იმავე ნაწილებს იღებს (stats-ში coalesced=True).
+    """
+
+    stats = {} if stats is None else stats
+    yield from _in_flight.stream(
+        _flight_key(user_question, context),
+        lambda: _generate_stream(user_question, context, stats, client),
+        on_shared=lambda: stats.update(coalesced=True),
+    )
+
+
+def _generate_stream(user_question, context, stats, client):
+    client = client or get_genai_client()
+    with _limiter.slot(), span("llm.stream", model=MODEL_NAME, context_chars=len(context)) as attrs:
+        started = time.perf_counter()
+        usage = None
+        count("gemini_generate_calls")
+        for chunk in client.models.generate_content_stream(
+            model=MODEL_NAME,
+            contents=build_prompt(user_question, context),
+        ):
+            # Usage metadata is cumulative; the last chunk carries the final counts
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            if not chunk.text:
+                continue
+            if "time_to_first_token" not in stats:
+                stats["time_to_first_token"] = time.perf_counter() - started
+            yield chunk.text
+
+        stats["total_time"] = time.perf_counter() - started
+        _record_usage(stats, usage)
+        attrs.update(stats)
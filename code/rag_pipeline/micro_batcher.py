@@ -0,0 +1,88 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from core.tracing import span, count, metrics
+
+
+class MicroBatcher:
+    """
+    აერთიანებს რამდენიმე მილიწამის ფანჯარაში ერთდროულად შემოსულ შეკითხვებს და ასრულებს მათ ერთი
+    HybridRAG.retrieve_many_hits გამოძახებით — ანუ ერთი batch ემბედინგის მოთხოვნითა და ერთი Chroma query-ით.
+    retrieve() ბლოკავს გამომძახებელ თრედს, სანამ მისი batch არ დასრულდება. იდენტური შეკითხვა, რომლის შედეგიც ჯერ
+    მზად არ არის, ახალ ჩანაწერს რიგში აღარ ამატებს და არსებულ Future-ს უერთდება (single-flight).
+    აწყობილი batch-ები სრულდება max_in_flight ზომის თრედების პულში, ამიტომ ერთი ნელი round trip მომდევნო batch-ებს
+    არ აჩერებს; როცა ყველა ადგილი დაკავებულია, ახალი შეკითხვები რიგში გროვდება და შემდეგ უფრო დიდ batch-ად იგზავნება.
+    """
+
+    def __init__(self, rag, max_batch_size=32, max_wait_ms=5, max_in_flight=4):
+        self.rag = rag
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="micro-batch")
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, query) -> Future:
+        with self._pending_lock:
+            future = self._pending.get(query)
+            if future is not None:
+                count("retrieve_coalesced")
+                return future
+            future = Future()
+            self._pending[query] = future
+        self._queue.put((query, future))
+        metrics.set_gauge("microbatch_queue_depth", self._queue.qsize())
+        return future
+
+    def _resolve(self, query, future, result=None, error=None):
+        with self._pending_lock:
+            self._pending.pop(query, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def retrieve(self, query, timeout=None):
+        return self.submit(query).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Wait for a free dispatch slot first, so queries arriving meanwhile join the next batch
+            self._slots.acquire()
+            batch = self._collect()
+            metrics.set_gauge("microbatch_queue_depth", self._queue.qsize())
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        queries = [query for query, _ in batch]
+        count("microbatch_batches")
+        count("microbatch_queries", len(batch))
+        try:
+            with span("microbatch", batch_size=len(batch)):
+                results = self.rag.retrieve_many_hits(queries)
+        except Exception as e:
+            for query, future in batch:
+                self._resolve(query, future, error=e)
+            return
+        finally:
+            self._slots.release()
+        for (query, future), result in zip(batch, results):
+            self._resolve(query, future, result)
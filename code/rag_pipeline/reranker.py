@@ -0,0 +1,150 @@
+import os
+import json
+import numpy as np
+from processing.data_processing import chunks_fingerprint
+from core.tracing import count
+
+EMBEDDINGS_FILE = "./data/chunk_embeddings.npy"
+EMBEDDINGS_META_FILE = "./data/chunk_embeddings.json"
+# Bumped when matrices written by earlier versions must be rebuilt (2: never built from quantized vectors)
+EMBEDDINGS_FORMAT = 2
+
+
+def _l2_normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores, top_k):
+    """აბრუნებს top_k საუკეთესო ქულის ინდექსებს კლებადობით, სრული სორტირების გარეშე."""
+    if top_k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, top_k)[:top_k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class ChunkEmbeddingMatrix:
+    """
+    ყველა ფრაგმენტის L2-ნორმალიზებული float32 ემბედინგების მატრიცა, რომელიც ინახება chunks.jsonl-ის გვერდით .npy ფაილში
+    და იტვირთება memmap-ით. მწკრივის ინდექსი ემთხვევა ფრაგმენტის პოზიციას chunks სიაში.
+    rerank ფუნქცია კანდიდატებს აფასებს ერთი მატრიცა-ვექტორული ნამრავლით და argpartition-ით ირჩევს საუკეთესოებს,
+    ამიტომ BM25-ით ნაპოვნი ფრაგმენტები დამატებით API გამოძახებას აღარ საჭიროებენ.
+    """
+
+    def __init__(self, matrix, chunks):
+        self.matrix = matrix
+        self.documents = [chunk['text'] for chunk in chunks]
+        self.position = {text: i for i, text in enumerate(self.documents)}
+
+    @classmethod
+    def load_or_build(cls, chunks, collection, embedding_model,
+                      path=EMBEDDINGS_FILE, meta_path=EMBEDDINGS_META_FILE):
+        """
+        ტვირთავს მატრიცას დისკიდან, თუ ის შეესაბამება მიმდინარე ფრაგმენტებს, მოდელს და წყაროს ვექტორების განზომილებას
+        (მეტამონაცემებში ინახება dim და dtype); წინააღმდეგ შემთხვევაში თავიდან აგებს და ინახავს.
+        """
+        fingerprint = chunks_fingerprint(chunks)
+        if os.path.exists(path) and os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            matrix = np.load(path, mmap_mode="r")
+            source_dim = cls._source_dim(collection)
+            if (
+                meta.get("format") == EMBEDDINGS_FORMAT
+                and meta.get("fingerprint") == fingerprint
+                and meta.get("model") == embedding_model.name()
+                and meta.get("dtype") == str(matrix.dtype)
+                and meta.get("count") == len(matrix)
+                and meta.get("dim") == (int(matrix.shape[1]) if matrix.ndim == 2 else 0)
+                and source_dim in (None, meta.get("dim"))
+            ):
+                print(f"✅ Loaded chunk embedding matrix {matrix.shape} from {path}")
+                return cls(matrix, chunks)
+            print("⚠️ Chunk embedding matrix does not match the chunks or vectors, rebuilding it")
+
+        print("🔄 Building chunk embedding matrix...")
+        matrix = cls._collect_embeddings(chunks, collection, embedding_model)
+        cls._save(matrix, path, meta_path, {
+            "format": EMBEDDINGS_FORMAT,
+            "fingerprint": fingerprint,
+            "model": embedding_model.name(),
+            "count": int(matrix.shape[0]),
+            "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            "dtype": str(matrix.dtype),
+        })
+        print(f"✅ Saved chunk embedding matrix {matrix.shape} to {path}")
+        return cls(np.load(path, mmap_mode="r"), chunks)
+
+    @staticmethod
+    def _source_dim(collection):
+        """Chroma კოლექციის ვექტორების განზომილება (ერთი ჩანაწერით); None, თუ ის იაფად ვერ დგინდება."""
+        # A quantized store's vectors are truncated; its source is not opened just for this check
+        if hasattr(collection, "full_precision_source"):
+            return None
+        page = collection.get(include=['embeddings'], limit=1)
+        embeddings = page.get("embeddings")
+        if embeddings is None or len(embeddings) == 0:
+            return None
+        return len(embeddings[0])
+
+    @staticmethod
+    def _collect_embeddings(chunks, collection, embedding_model, page_size=1000):
+        # Reuse the vectors already stored in Chroma; only chunks missing there are embedded
+        texts = [chunk['text'] for chunk in chunks]
+        by_text = {}
+        # Quantized stores return truncated, dequantized vectors: read the full-precision collection behind them
+        if hasattr(collection, "full_precision_source"):
+            collection = collection.full_precision_source()
+        total = collection.count() if collection is not None else 0
+        for offset in range(0, total, page_size):
+            page = collection.get(include=['documents', 'embeddings'], limit=page_size, offset=offset)
+            documents = page.get("documents")
+            embeddings = page.get("embeddings")
+            # Chroma may return embeddings as a numpy array, so no truthiness checks here
+            if documents is None or embeddings is None:
+                continue
+            for doc, emb in zip(documents, embeddings):
+                by_text[doc] = emb
+
+        missing = [text for text in dict.fromkeys(texts) if text not in by_text]
+        if missing:
+            print(f"⚠️ {len(missing)} chunks missing from the collection, embedding them...")
+            by_text.update(zip(missing, embedding_model(missing)))
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return _l2_normalize(np.stack([np.asarray(by_text[text], dtype=np.float32) for text in texts]))
+
+    @staticmethod
+    def _save(matrix, path, meta_path, meta):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def rerank(self, query_emb, chunk_texts, top_k=5, embedding_model=None):
+        """
+        ალაგებს chunk_texts-ს კითხვის ემბედინგთან კოსინუსური მსგავსებით და აბრუნებს (text, score) წყვილების სიას.
+        ტექსტები, რომლებიც მატრიცაში არ არის, ემბედდება embedding_model-ით (თუ მოწოდებულია), წინააღმდეგ შემთხვევაში გამოიტოვება.
+        """
+        query = _l2_normalize(query_emb)
+        known = [text for text in chunk_texts if text in self.position]
+        unknown = [text for text in chunk_texts if text not in self.position]
+
+        texts = known
+        scores = self.matrix[[self.position[text] for text in known]] @ query if known else np.zeros(0, np.float32)
+        if unknown and embedding_model is not None:
+            count("rerank_fallback_embeddings", len(unknown))
+            extra = _l2_normalize(embedding_model(unknown)) @ query
+            texts = known + unknown
+            scores = np.concatenate([scores, extra])
+
+        order = _top_k(scores, top_k)
+        return [(texts[i], float(scores[i])) for i in order]
@@ -1,32 +1,180 @@
-from rank_bm25 import BM25Okapi
+import os
 import re
+from collections import Counter
+import numpy as np
+from processing.data_processing import chunks_fingerprint
+
+SPARSE_INDEX_FILE = "./data/sparse_index.npz"
+
+SUPERSCRIPT_DIGITS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹", "0123456789")
+# "12¹" (superscript) and "12^1" (how users type it) both become the single token "12_1"
+SUPERSCRIPT_NUMBER_PATTERN = re.compile(r"(\d+)\s*([⁰¹²³⁴⁵⁶⁷⁸⁹]+)")
+CARET_NUMBER_PATTERN = re.compile(r"(\d+)\^(\d+)")
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    ქართული ტექსტის ტოკენიზატორი: შლის პუნქტუაციას და zero-width სიმბოლოებს, ტექსტს გადაიყვანს პატარა ასოებში
+    და მუხლების ზედა ინდექსიან ნომრებს (მაგ., „12¹“ ან „12^1“) ერთ ტოკენად „12_1“ აქცევს.
+    """
+    text = text.replace("\u200b", "")
+    text = SUPERSCRIPT_NUMBER_PATTERN.sub(lambda m: f"{m.group(1)}_{m.group(2).translate(SUPERSCRIPT_DIGITS)}", text)
+    text = CARET_NUMBER_PATTERN.sub(r"\1_\2", text)
+    return TOKEN_PATTERN.findall(text.lower())
+
 
 class SparseRetriever:
     """
     ეს კლასი გამოიყენება ტექსტის ძიებისა და რანჟირებისთვის BM25 ალგორითმის გამოყენებით, რომელიც განკუთვნილია ქართული ტექსტის დამუშავებისთვის.
-    __init__(self, chunks):
-    ინიციალიზაციის ფუნქცია, რომელიც იღებს ტექსტის ფრაგმენტებს (chunks), ინახავს მათ, ახდენს მათ ტოკენიზაციას (ტექსტის სიტყვებად დაყოფას) და ქმნის BM25Okapi ობიექტს, რომელიც გამოიყენება ძიებისთვის.
+    __init__(self, chunks, index_path):
+    ინიციალიზაციის ფუნქცია, რომელიც ტვირთავს დისკზე შენახულ ინვერსიულ ინდექსს (term → postings), თუ ის ემთხვევა ფრაგმენტებს,
+    წინააღმდეგ შემთხვევაში ახდენს ფრაგმენტების ტოკენიზაციას, აგებს ინდექსს CSR ფორმატში და ინახავს მას.
     tokenize(self, text):
-    მარტივი ტოკენიზატორი, რომელიც ქართულ ტექსტს ასუფთავებს ზედმეტი სფეისებისგან და ყოფს სიტყვებად, აბრუნებს სიტყვების სიას.
+    ქართული ტოკენიზატორი, რომელიც აბრუნებს ნორმალიზებული სიტყვების სიას.
     search(self, query, top_k=10):
-    ძიების ფუნქცია, რომელიც იღებს მომხმარებლის შეკითხვას (query), ახდენს მის ტოკენიზაციას, აფასებს დოკუმენტებს BM25 ალგორითმის მიხედვით და აბრუნებს top_k რაოდენობის ყველაზე შესაბამისი დოკუმენტის ტექსტს, რანჟირებული ქულების მიხედვით.
+    ძიების ფუნქცია, რომელიც ქულებს ითვლის მხოლოდ იმ დოკუმენტებისთვის, რომლებიც შეიცავენ შეკითხვის ტოკენებს,
+    და აბრუნებს top_k რაოდენობის ყველაზე შესაბამისი დოკუმენტის ტექსტს, რანჟირებული ქულების მიხედვით.
     """
-    
-    def __init__(self, chunks):
-        # Preprocess chunks into token lists
+
+    def __init__(self, chunks, index_path=SPARSE_INDEX_FILE, k1=1.5, b=0.75):
         self.documents = [chunk['text'] for chunk in chunks]
-        self.tokenized_docs = [self.tokenize(doc) for doc in self.documents]
-        self.bm25 = BM25Okapi(self.tokenized_docs)
+        self.k1 = k1
+        self.b = b
+
+        fingerprint = chunks_fingerprint(chunks)
+        if not self._load(index_path, fingerprint):
+            print("🔄 Building sparse BM25 index...")
+            self._build()
+            if index_path:
+                self._save(index_path, fingerprint)
+                print(f"✅ Saved sparse index ({len(self.vocab)} terms) to {index_path}")
+
+    @classmethod
+    def from_arrays(cls, documents, vocab, indptr, doc_ids, weights, idf, k1=1.5, b=0.75):
+        """ქმნის retriever-ს უკვე აგებული (მაგ., memmap-ით ჩატვირთული) ინდექსის მასივებიდან, ტოკენიზაციის გარეშე."""
+        retriever = cls.__new__(cls)
+        retriever.documents = documents
+        retriever.k1 = k1
+        retriever.b = b
+        retriever.vocab = {term: i for i, term in enumerate(vocab)}
+        retriever.indptr = indptr
+        retriever.doc_ids = doc_ids
+        retriever.weights = weights
+        retriever.idf = idf
+        return retriever
+
+    def arrays(self):
+        """ინდექსის მასივები დისკზე შესანახად (vocab — ტერმინები id-ების თანმიმდევრობით)."""
+        return {
+            "vocab": sorted(self.vocab, key=self.vocab.get),
+            "indptr": self.indptr,
+            "doc_ids": self.doc_ids,
+            "weights": self.weights,
+            "idf": self.idf,
+        }
 
     def tokenize(self, text):
-        # Simple Georgian tokenizer 
-        text = re.sub(r'\s+', ' ', text)
-        return text.split(" ")
+        return tokenize(text)
+
+    def _build(self):
+        doc_term_counts = [Counter(self.tokenize(doc)) for doc in self.documents]
+        doc_lengths = np.array([sum(counts.values()) for counts in doc_term_counts], dtype=np.float32)
+        avgdl = float(doc_lengths.mean()) if len(doc_lengths) and doc_lengths.mean() > 0 else 1.0
+
+        postings = {}
+        for doc_id, counts in enumerate(doc_term_counts):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        terms = sorted(postings)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids = []
+        term_freqs = []
+        for i, term in enumerate(terms):
+            entries = postings[term]
+            indptr[i + 1] = indptr[i] + len(entries)
+            doc_ids.extend(doc_id for doc_id, _ in entries)
+            term_freqs.extend(tf for _, tf in entries)
+
+        doc_ids = np.array(doc_ids, dtype=np.int32)
+        tf = np.array(term_freqs, dtype=np.float32)
+        # Document-length normalised term weight, precomputed per posting
+        norm = self.k1 * (1 - self.b + self.b * doc_lengths[doc_ids] / avgdl)
+        weights = tf * (self.k1 + 1) / (tf + norm)
+
+        n_docs = len(self.documents)
+        df = np.diff(indptr).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights.astype(np.float32)
+        self.idf = idf
+
+    def _save(self, path, fingerprint):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        arrays = self.arrays()
+        arrays["vocab"] = np.array(arrays["vocab"])
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                fingerprint=np.array(fingerprint),
+                params=np.array([self.k1, self.b], dtype=np.float64),
+                **arrays,
+            )
+        os.replace(tmp_path, path)
+
+    def _load(self, path, fingerprint):
+        if not path or not os.path.exists(path):
+            return False
+        with np.load(path) as data:
+            if str(data["fingerprint"]) != fingerprint or data["params"].tolist() != [self.k1, self.b]:
+                return False
+            self.vocab = {term: i for i, term in enumerate(data["vocab"].tolist())}
+            self.indptr = data["indptr"]
+            self.doc_ids = data["doc_ids"]
+            self.weights = data["weights"]
+            self.idf = data["idf"]
+        print(f"✅ Loaded sparse index ({len(self.vocab)} terms) from {path}")
+        return True
+
+    def get_scores(self, query):
+        """BM25 ქულები ყველა დოკუმენტისთვის; გამოითვლება მხოლოდ შესაბამისი postings სიების დაგროვებით."""
+        query_terms = Counter(self.tokenize(query))
+        slices = []
+        for term, qtf in query_terms.items():
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            slices.append((self.doc_ids[start:end], self.weights[start:end] * (qtf * self.idf[term_id])))
+
+        if not slices:
+            return np.zeros(len(self.documents), dtype=np.float32)
+        doc_ids = np.concatenate([ids for ids, _ in slices])
+        contributions = np.concatenate([w for _, w in slices])
+        return np.bincount(doc_ids, weights=contributions, minlength=len(self.documents))
 
-    def search(self, query, top_k=10):
-        tokenized_query = self.tokenize(query)
-        scores = self.bm25.get_scores(tokenized_query)
-        top_indices = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:top_k]
-        return [self.documents[i] for i in top_indices]
-    
+    def search_scored(self, query, top_k=10, candidates=None):
+        """
+        აბრუნებს (ფრაგმენტის პოზიცია, BM25 ქულა) წყვილებს კლებადობით; ნულოვანი ქულის მქონე დოკუმენტები გამოირიცხება.
+        candidates (ფრაგმენტების პოზიციები) ზღუდავს ძიებას კორპუსის ნაწილით, მაგ., ერთი წიგნით ან თავით.
+        """
+        scores = self.get_scores(query)
+        if candidates is not None:
+            candidates = np.asarray(candidates, dtype=np.int64)
+            matched = candidates[scores[candidates] > 0]
+        else:
+            matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(i), float(scores[i])) for i in matched]
 
+    def search(self, query, top_k=10, candidates=None):
+        return [self.documents[i] for i, _ in self.search_scored(query, top_k, candidates)]
@@ -6,34 +6,472 @@ try:
 except ImportError:
     print("⚠️ pysqlite3-binary not installed, relying on system SQLite")
 
-import chromadb
+import os
+import json
+import threading
+import functools
+import numpy as np
 from core.embeddings import GeminiEmbeddingFunction
+from processing.data_processing import chunks_fingerprint
 
-# Persistent client (ინახება მეხსიერებაში)
-chroma_client = chromadb.PersistentClient(path="./data/chroma_db")
+CHROMA_PATH = "./data/chroma_db"
 
-def load_data(all_chunks):
+_chroma_client = None
+_chroma_lock = threading.Lock()
+
+
+def get_chroma_client():
+    """Persistent client (ინახება დისკზე), რომელიც იქმნება პირველი გამოყენებისას და არა მოდულის იმპორტისას."""
+    global _chroma_client
+    if _chroma_client is None:
+        with _chroma_lock:
+            if _chroma_client is None:
+                import chromadb
+                _chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
+    return _chroma_client
+
+COLLECTION_NAME = "georgian_civil_code"
+BATCH_SIZE = 500
+
+
+def _batched(items, size=BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def load_data(all_chunks, sync=False, client=None, embedding_function=None, bulk_embedder=None):
     """
     ეს ფუნქცია ქმნის ან იღებს Chroma მონაცემთა ბაზის კოლექციას სახელად „georgian_civil_code“ და ავსებს მას მოწოდებული ტექსტის ფრაგმენტებით (all_chunks),
     თუ ის ცარიელია. ფუნქცია იყენებს GeminiEmbeddingFunction-ს ტექსტის ემბედინგისთვის (ვექტორულ წარმოდგენად გარდაქმნისთვის).
-    თუ კოლექცია ცარიელია, ის ამატებს ფრაგმენტების ID-ებს, ტექსტებსა და მეტამონაცემებს.
-    თუ კოლექცია უკვე შევსებულია, გამოტოვებს ამ ნაბიჯს. აბრუნებს კოლექციის ობიექტს.
+    თუ კოლექცია ცარიელია, ის ამატებს ფრაგმენტების სტაბილურ ID-ებს, ტექსტებსა და მეტამონაცემებს.
+    თუ კოლექცია უკვე შევსებულია, გამოტოვებს ამ ნაბიჯს, ხოლო sync=True შემთხვევაში ასინქრონებს მას sync_collection-ით. აბრუნებს კოლექციის ობიექტს.
+    თუ კოლექციის id-ები ფრაგმენტების id-ებს არ ემთხვევა (მაგ., ძველი „chunk_N“ id-ები), კოლექცია sync_collection-ით მიგრირდება.
+    client და embedding_function პარამეტრებით შესაძლებელია სხვა Chroma კლიენტისა და ემბედინგის ფუნქციის გამოყენება (მაგ., ბენჩმარკში).
+    bulk_embedder (BulkEmbedder) ახალ ფრაგმენტებს წინასწარ ემბედდებს პარალელურად, rate limit-ისა და ხელახალი ცდების გათვალისწინებით.
     """
     
-    collection = chroma_client.get_or_create_collection(
-        name="georgian_civil_code",
-        embedding_function=GeminiEmbeddingFunction()
+    collection = (client or get_chroma_client()).get_or_create_collection(
+        name=COLLECTION_NAME,
+        embedding_function=embedding_function or GeminiEmbeddingFunction()
     )
 
     if collection.count() == 0:
         print("Collection empty. Embedding and adding chunks...")
-        collection.add(
-            ids=[f"chunk_{i+1}" for i in range(len(all_chunks))],
-            documents=[chunk['text'] for chunk in all_chunks],
-            metadatas=[chunk['metadata'] for chunk in all_chunks]
-        )
+        embeddings = _bulk_embed(bulk_embedder, all_chunks)
+        for i, batch in enumerate(_batched(all_chunks)):
+            collection.add(
+                ids=[chunk['id'] for chunk in batch],
+                documents=[chunk['text'] for chunk in batch],
+                metadatas=[chunk['metadata'] for chunk in batch],
+                **_batch_embeddings(embeddings, i)
+            )
         print("✅ Data added successfully.")
+    elif sync:
+        sync_collection(collection, all_chunks, bulk_embedder=bulk_embedder)
+    elif set(collection.get(include=[])["ids"]) != {chunk['id'] for chunk in all_chunks}:
+        # e.g. legacy "chunk_N" ids: retrieval maps ids to chunks, so unknown ids would silently drop dense results
+        print("⚠️ Collection ids do not match the chunks. Migrating with sync_collection...")
+        sync_collection(collection, all_chunks, bulk_embedder=bulk_embedder)
     else:
         print("✅ Collection already populated. Skipping embedding.")
 
-    return collection
\ No newline at end of file
+    return collection
+
+
+def _bulk_embed(bulk_embedder, chunks):
+    if bulk_embedder is None or not chunks:
+        return None
+    embeddings = bulk_embedder.embed([chunk['text'] for chunk in chunks])
+    print(f"✅ Bulk embedding: {bulk_embedder.last_report}")
+    return embeddings
+
+
+def _batch_embeddings(embeddings, batch_index, size=BATCH_SIZE):
+    # Without precomputed embeddings Chroma calls the collection's embedding function itself
+    if embeddings is None:
+        return {}
+    return {"embeddings": embeddings[batch_index * size:(batch_index + 1) * size]}
+
+
+def sync_collection(collection, all_chunks, bulk_embedder=None):
+    """
+    ადარებს ახალ ფრაგმენტებს კოლექციაში არსებულ ჩანაწერებს content_hash-ის მიხედვით:
+    ახალ ან შეცვლილ ფრაგმენტებს აკეთებს upsert-ს, ხოლო კოდექსიდან ამოღებულ ფრაგმენტებს შლის.
+    თუ შეცვლილი ფრაგმენტის ტექსტი უკვე არსებობს კოლექციაში (მაგ., მხოლოდ მეტამონაცემები ან id შეიცვალა), არსებული ემბედინგი ხელახლა გამოიყენება.
+    აბრუნებს ცვლილებების სტატისტიკას.
+    """
+
+    existing = collection.get(include=['metadatas'])
+    existing_hashes = {
+        chunk_id: (metadata or {}).get("content_hash")
+        for chunk_id, metadata in zip(existing["ids"], existing["metadatas"])
+    }
+    new_chunks = {chunk['id']: chunk for chunk in all_chunks}
+
+    changed = [
+        chunk for chunk_id, chunk in new_chunks.items()
+        if existing_hashes.get(chunk_id) != chunk['metadata']['content_hash']
+    ]
+    removed = [chunk_id for chunk_id in existing_hashes if chunk_id not in new_chunks]
+
+    # Look up embeddings of records that are about to be replaced, keyed by their text
+    reusable = {}
+    stale_ids = removed + [chunk['id'] for chunk in changed if chunk['id'] in existing_hashes]
+    for batch in _batched(stale_ids):
+        records = collection.get(ids=batch, include=['documents', 'embeddings'])
+        for doc, emb in zip(records["documents"], records["embeddings"]):
+            reusable[doc] = emb
+
+    with_embeddings = [chunk for chunk in changed if chunk['text'] in reusable]
+    to_embed = [chunk for chunk in changed if chunk['text'] not in reusable]
+
+    for batch in _batched(with_embeddings):
+        collection.upsert(
+            ids=[chunk['id'] for chunk in batch],
+            documents=[chunk['text'] for chunk in batch],
+            metadatas=[chunk['metadata'] for chunk in batch],
+            embeddings=[reusable[chunk['text']] for chunk in batch]
+        )
+    embeddings = _bulk_embed(bulk_embedder, to_embed)
+    for i, batch in enumerate(_batched(to_embed)):
+        collection.upsert(
+            ids=[chunk['id'] for chunk in batch],
+            documents=[chunk['text'] for chunk in batch],
+            metadatas=[chunk['metadata'] for chunk in batch],
+            **_batch_embeddings(embeddings, i)
+        )
+    for batch in _batched(removed):
+        collection.delete(ids=batch)
+
+    stats = {
+        "upserted": len(changed),
+        "embedded": len(to_embed),
+        "reused_embeddings": len(with_embeddings),
+        "deleted": len(removed),
+        "unchanged": len(new_chunks) - len(changed),
+    }
+    print(f"✅ Collection synced: {stats}")
+    return stats
+
+
+# "chroma" (default) or "quantized" (QuantizedVectorStore, in-process)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+QUANTIZED_INDEX_FILE = "./data/quantized_index.npz"
+QUANTIZED_DTYPE = os.getenv("QUANTIZED_DTYPE", "int8")
+QUANTIZED_DIMS = int(os.getenv("QUANTIZED_DIMS", "768"))
+SCORE_BLOCK_ROWS = 8192
+
+
+def _normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _kmeans(vectors, n_lists, iterations=10, seed=0):
+    """მარტივი სფერული k-means IVF ცენტროიდებისთვის (ნორმალიზებულ ვექტორებზე, კოსინუსური მსგავსებით)."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for i in range(n_lists):
+            members = vectors[assignment == i]
+            # An empty list keeps its previous centroid
+            if len(members):
+                centroids[i] = members.sum(axis=0)
+        centroids = _normalize_rows(centroids)
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+class QuantizedVectorStore:
+    """
+    Chroma-ს ალტერნატიული, პროცესის შიგნით მომუშავე ვექტორული საცავი. ახორციელებს Chroma კოლექციის იმ ნაწილს,
+    რომელსაც პაიპლაინი იყენებს (count, get, query), ამიტომ HybridRAG-ს და ChunkEmbeddingMatrix-ს ორივე ერთნაირად მიეწოდება.
+    ვექტორები ინახება ერთ უწყვეტ NumPy მასივში:
+    - dims: Matryoshka შემოკლება (პირველი dims კომპონენტი, ხელახალი ნორმალიზაციით);
+    - dtype="int8": თითოეული ვექტორი საკუთარი მასშტაბით (scale) კვანტდება; dtype="float16": ნახევარი სიზუსტე;
+    - n_lists > 0: IVF ძიება (k-means ცენტროიდები, query-ზე მხოლოდ n_probe უახლოესი სია მოწმდება), 0 — ზუსტი ძიება;
+    - full_vectors (მაგ., memmap-ით ჩატვირთული სრული სიზუსტის მატრიცა): საუკეთესო კანდიდატების ხელახალი შეფასება (rescoring);
+      full_vector_ids მატრიცის მწკრივების id-ებია (ნაგულისხმევად — საცავის ids), მწკრივი ყოველთვის id-ით მოიძებნება;
+    - source: კოლექცია, რომლიდანაც საცავი აიგო (ან ფუნქცია, რომელიც მას გახსნის) — get(include=["embeddings"])
+      შემოკლებულ, დეკვანტირებულ ვექტორებს აბრუნებს, ამიტომ სრული სიზუსტის ვექტორები (მაგ., reranker-ისთვის) აქედან აიღება.
+    distances ბრუნდება Chroma-ს ნაგულისხმევი l2 სივრცის ფორმით (ნორმალიზებულ ვექტორებზე 2 - 2·cos).
+    """
+
+    def __init__(self, ids, documents, metadatas, embeddings, dtype="int8", dims=None, n_lists=0, n_probe=8,
+                 full_vectors=None, rescore_factor=4, full_vector_ids=None, source=None):
+        if dtype not in ("int8", "float16", "float32"):
+            raise ValueError(f"unsupported dtype: {dtype}")
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = [metadata or {} for metadata in metadatas]
+        self.dtype = dtype
+        self.n_probe = n_probe
+        self.rescore_factor = rescore_factor
+        self._position = {chunk_id: i for i, chunk_id in enumerate(self.ids)}
+        self._columns = {}
+        self._source = source
+        self._attach_full_vectors(full_vectors, full_vector_ids)
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        self.dims = min(dims or embeddings.shape[1], embeddings.shape[1]) if embeddings.ndim == 2 else 0
+        vectors = _normalize_rows(embeddings[:, :self.dims]) if len(embeddings) else np.zeros((0, self.dims), np.float32)
+        self._quantize(vectors)
+
+        self.centroids = None
+        self.lists = None
+        if n_lists and len(vectors) > n_lists:
+            self.centroids, assignment = _kmeans(vectors, n_lists)
+            order = np.argsort(assignment, kind="stable")
+            self.lists = np.split(order, np.cumsum(np.bincount(assignment, minlength=n_lists))[:-1])
+
+    def _attach_full_vectors(self, full_vectors, full_vector_ids=None):
+        """full_rows[i] — i-ური ჩანაწერის მწკრივი full_vectors-ში, ან -1, თუ მატრიცაში ეს id არ არის."""
+        self.full_vectors = full_vectors
+        self.full_rows = None
+        if full_vectors is None:
+            return
+        if full_vector_ids is None:
+            full_vector_ids = self.ids
+        row_of = {chunk_id: row for row, chunk_id in enumerate(full_vector_ids)}
+        self.full_rows = np.array([row_of.get(chunk_id, -1) for chunk_id in self.ids], dtype=np.int64)
+
+    def full_precision_source(self):
+        """კოლექცია სრული სიზუსტის ვექტორებით, საიდანაც საცავი აიგო (საჭიროებისას იხსნება); None, თუ უცნობია."""
+        if callable(self._source):
+            self._source = self._source()
+        return self._source
+
+    def _quantize(self, vectors):
+        if self.dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127 if len(vectors) else np.zeros(0, np.float32)
+            scales[scales == 0] = 1.0
+            self.codes = np.round(vectors / scales[:, None]).astype(np.int8)
+            self.scales = scales.astype(np.float32)
+        else:
+            self.codes = vectors.astype(self.dtype)
+            self.scales = None
+
+    @property
+    def nbytes(self):
+        """საძიებო ინდექსის მეხსიერება (ბაიტები): კვანტირებული ვექტორები, მასშტაბები და IVF ცენტროიდები."""
+        total = self.codes.nbytes
+        if self.scales is not None:
+            total += self.scales.nbytes
+        if self.centroids is not None:
+            total += self.centroids.nbytes + sum(lst.nbytes for lst in self.lists)
+        return total
+
+    def count(self):
+        return len(self.ids)
+
+    def _prepare_query(self, query_emb):
+        query = np.asarray(query_emb, dtype=np.float32)[:self.dims]
+        return query / (np.linalg.norm(query) or 1.0)
+
+    def _scores(self, query, rows=None):
+        """კოსინუსური მსგავსება query-სა და (rows) ვექტორებს შორის; კოდები float32-ში ბლოკებად გადაიყვანება."""
+        codes = self.codes if rows is None else self.codes[rows]
+        if codes.dtype == np.float32:
+            return codes @ query
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            block = codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            scores[start:start + SCORE_BLOCK_ROWS] = block @ query
+        if self.scales is not None:
+            scores *= self.scales if rows is None else self.scales[rows]
+        return scores
+
+    def _column(self, key):
+        if key not in self._columns:
+            self._columns[key] = np.array([metadata.get(key) for metadata in self.metadatas], dtype=object)
+        return self._columns[key]
+
+    def _where_mask(self, where):
+        """Chroma where ფილტრის ქვესიმრავლე: {"key": value}, {"key": {"$eq"/"$ne"/"$in": ...}}, $and და $or."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for sub in condition:
+                    mask &= self._where_mask(sub)
+            elif key == "$or":
+                mask &= np.logical_or.reduce([self._where_mask(sub) for sub in condition])
+            elif isinstance(condition, dict):
+                (operator, value), = condition.items()
+                column = self._column(key)
+                if operator == "$eq":
+                    mask &= column == value
+                elif operator == "$ne":
+                    mask &= column != value
+                elif operator == "$in":
+                    mask &= np.isin(column, list(value))
+                else:
+                    raise ValueError(f"unsupported where operator: {operator}")
+            else:
+                mask &= self._column(key) == condition
+        return mask
+
+    def _candidates(self, query, where):
+        rows = None
+        if self.centroids is not None:
+            probe = np.argsort(-(self.centroids @ query))[:self.n_probe]
+            rows = np.sort(np.concatenate([self.lists[i] for i in probe]))
+        if where:
+            mask = self._where_mask(where)
+            rows = np.flatnonzero(mask) if rows is None else rows[mask[rows]]
+        return rows
+
+    def _search(self, query_emb, n_results, where):
+        query = self._prepare_query(query_emb)
+        rows = self._candidates(query, where)
+        scores = self._scores(query, rows)
+        positions = np.arange(len(self.ids)) if rows is None else rows
+
+        keep = n_results * self.rescore_factor if self.full_vectors is not None else n_results
+        if len(scores) > keep:
+            top = np.argpartition(-scores, keep)[:keep]
+            positions, scores = positions[top], scores[top]
+
+        if self.full_vectors is not None and len(positions):
+            full_query = np.asarray(query_emb, dtype=np.float32)
+            full_query = full_query / (np.linalg.norm(full_query) or 1.0)
+            order = np.argsort(positions)
+            positions, scores = positions[order], scores[order]
+            rows = self.full_rows[positions]
+            # Records missing from the full-precision matrix keep their quantized score
+            found = rows >= 0
+            scores[found] = np.asarray(self.full_vectors[rows[found]], dtype=np.float32) @ full_query
+
+        order = np.argsort(-scores, kind="stable")[:n_results]
+        return positions[order], scores[order]
+
+    def query(self, query_embeddings, n_results=10, where=None, include=("documents", "metadatas", "distances")):
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query_emb in query_embeddings:
+            positions, scores = self._search(query_emb, n_results, where)
+            result["ids"].append([self.ids[i] for i in positions])
+            result["documents"].append([self.documents[i] for i in positions])
+            result["metadatas"].append([self.metadatas[i] for i in positions])
+            result["distances"].append([float(2 - 2 * score) for score in scores])
+        return {key: (value if key == "ids" or key in include else None) for key, value in result.items()}
+
+    def _embeddings(self, positions):
+        positions = np.asarray(positions, dtype=np.int64)
+        if self.full_vectors is not None and np.all(self.full_rows[positions] >= 0):
+            return np.asarray(self.full_vectors[self.full_rows[positions]], dtype=np.float32)
+        vectors = self.codes[positions].astype(np.float32)
+        return vectors * self.scales[positions, None] if self.scales is not None else vectors
+
+    def get(self, ids=None, include=("documents", "metadatas"), limit=None, offset=0):
+        positions = list(range(len(self.ids))) if ids is None else [self._position[i] for i in ids if i in self._position]
+        positions = positions[offset:None if limit is None else offset + limit]
+        result = {"ids": [self.ids[i] for i in positions]}
+        result["documents"] = [self.documents[i] for i in positions] if "documents" in include else None
+        result["metadatas"] = [self.metadatas[i] for i in positions] if "metadatas" in include else None
+        result["embeddings"] = self._embeddings(positions) if "embeddings" in include else None
+        return result
+
+    @classmethod
+    def from_collection(cls, collection, order=None, page_size=1000, **kwargs):
+        """
+        აგებს საცავს Chroma კოლექციაში უკვე შენახული ვექტორებიდან (ხელახალი ემბედინგის გარეშე).
+        order (id-ების სია) ალაგებს ჩანაწერებს ფრაგმენტების თანმიმდევრობით, რათა full_vectors-ის მწკრივები დაემთხვეს.
+        """
+        records = {}
+        for offset in range(0, collection.count(), page_size):
+            page = collection.get(include=['documents', 'metadatas', 'embeddings'], limit=page_size, offset=offset)
+            for record in zip(page["ids"], page["documents"], page["metadatas"], page["embeddings"]):
+                records[record[0]] = record
+        ids = [chunk_id for chunk_id in order if chunk_id in records] if order is not None else list(records)
+        rows = [records[chunk_id] for chunk_id in ids]
+        kwargs.setdefault("source", collection)
+        return cls(ids, [row[1] for row in rows], [row[2] for row in rows], [row[3] for row in rows], **kwargs)
+
+    def save(self, path, fingerprint):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        arrays = {"codes": self.codes}
+        if self.scales is not None:
+            arrays["scales"] = self.scales
+        if self.centroids is not None:
+            arrays["centroids"] = self.centroids
+            arrays["list_sizes"] = np.array([len(lst) for lst in self.lists], dtype=np.int64)
+            arrays["list_rows"] = np.concatenate(self.lists)
+        meta = {"fingerprint": fingerprint, "dtype": self.dtype, "dims": self.dims, "ids": self.ids,
+                "documents": self.documents, "metadatas": self.metadatas}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta, ensure_ascii=False)), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, fingerprint=None, n_probe=8, full_vectors=None, rescore_factor=4, full_vector_ids=None,
+             source=None):
+        """ტვირთავს შენახულ საცავს; fingerprint-ის შეუსაბამობისას აბრუნებს None-ს."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if fingerprint is not None and meta["fingerprint"] != fingerprint:
+                return None
+            store = cls.__new__(cls)
+            store.ids, store.documents, store.metadatas = meta["ids"], meta["documents"], meta["metadatas"]
+            store.dtype, store.dims = meta["dtype"], meta["dims"]
+            store.codes = data["codes"]
+            store.scales = data["scales"] if "scales" in data else None
+            store.centroids, store.lists = None, None
+            if "centroids" in data:
+                store.centroids = data["centroids"]
+                store.lists = np.split(data["list_rows"], np.cumsum(data["list_sizes"])[:-1])
+        store.n_probe = n_probe
+        store.rescore_factor = rescore_factor
+        store._position = {chunk_id: i for i, chunk_id in enumerate(store.ids)}
+        store._columns = {}
+        store._source = source
+        store._attach_full_vectors(full_vectors, full_vector_ids)
+        return store
+
+
+def _quantized_fingerprint(all_chunks, dtype, dims, n_lists):
+    return f"{chunks_fingerprint(all_chunks)}:{dtype}:{dims}:{n_lists}"
+
+
+def build_quantized_index(all_chunks, collection, index_path=QUANTIZED_INDEX_FILE, dtype=QUANTIZED_DTYPE,
+                          dims=QUANTIZED_DIMS, n_lists=0, full_vectors=None):
+    """აგებს QuantizedVectorStore-ს Chroma კოლექციის ვექტორებიდან და ინახავს index_path-ზე (ingest.py-ც იყენებს)."""
+    print("🔄 Building quantized vector index from the Chroma collection...")
+    chunk_ids = [chunk['id'] for chunk in all_chunks]
+    store = QuantizedVectorStore.from_collection(collection, order=chunk_ids, dtype=dtype, dims=dims, n_lists=n_lists,
+                                                 full_vectors=full_vectors, full_vector_ids=chunk_ids)
+    store.save(index_path, _quantized_fingerprint(all_chunks, dtype, dims, n_lists))
+    print(f"✅ Saved quantized vector index ({store.nbytes / 2**20:.1f} MB) to {index_path}")
+    return store
+
+
+def open_vector_store(all_chunks, backend=None, client=None, embedding_function=None, full_vectors=None,
+                      index_path=QUANTIZED_INDEX_FILE, dtype=QUANTIZED_DTYPE, dims=QUANTIZED_DIMS, n_lists=0):
+    """
+    აბრუნებს კონფიგურირებულ ვექტორულ საცავს (VECTOR_BACKEND): "chroma" — load_data-ს კოლექცია;
+    "quantized" — QuantizedVectorStore, რომელიც ტვირთავს დისკზე შენახულ ინდექსს ან, თუ ის მოძველებულია,
+    აგებს მას Chroma-ში შენახული ვექტორებიდან და ინახავს. full_vectors (ფრაგმენტების თანმიმდევრობით, მაგ., ბანდლის
+    ემბედინგების მატრიცა) ჩართავს სრული სიზუსტით rescoring-ს.
+    """
+    backend = backend or VECTOR_BACKEND
+    if backend == "chroma":
+        return load_data(all_chunks, client=client, embedding_function=embedding_function)
+    if backend != "quantized":
+        raise ValueError(f"unknown vector backend: {backend}")
+
+    chunk_ids = [chunk['id'] for chunk in all_chunks]
+    # The Chroma collection is only opened if full-precision vectors are needed (e.g. to build the rerank matrix)
+    source = functools.partial(load_data, all_chunks, client=client, embedding_function=embedding_function)
+    store = QuantizedVectorStore.load(index_path, _quantized_fingerprint(all_chunks, dtype, dims, n_lists),
+                                      full_vectors=full_vectors, full_vector_ids=chunk_ids, source=source)
+    if store is not None:
+        print(f"✅ Loaded quantized vector index ({store.count()} vectors, {store.dtype}, {store.dims} dims)")
+        return store
+
+    collection = load_data(all_chunks, client=client, embedding_function=embedding_function)
+    return build_quantized_index(all_chunks, collection, index_path, dtype, dims, n_lists, full_vectors)
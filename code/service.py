@@ -0,0 +1,284 @@
+import json
+import argparse
+import itertools
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from processing.data_processing import load_chunks
+from rag_pipeline.vector_store import load_data, open_vector_store
+from rag_pipeline.hybrid_rag import HybridRAG
+from rag_pipeline.answer_cache import AnswerCache
+from rag_pipeline.micro_batcher import MicroBatcher
+from rag_pipeline.context_assembler import ContextAssembler
+from rag_pipeline.llm import answer_question, stream_answer
+from rag_pipeline.index_bundle import load_bundle
+from core.embeddings import GeminiEmbeddingFunction
+from core.tracing import start_trace, metrics, span, count
+
+# Connections waiting for a free worker beyond which new ones get 503
+HTTP_MAX_QUEUED = 64
+# Seconds an idle keep-alive connection may hold a worker before it is closed
+KEEPALIVE_TIMEOUT = 15
+
+
+class RAGService:
+    """
+    HTTP სერვისის ბიზნეს-ლოგიკა: ძიება MicroBatcher-ის გავლით, კონტექსტის აწყობა ContextAssembler-ით და
+    პასუხის გენერაცია answer_question/stream_answer-ით, იგივე პასუხების ქეშით, რასაც Streamlit აპლიკაცია იყენებს.
+    """
+
+    def __init__(self, rag, batcher, answer_cache, assembler=None):
+        self.rag = rag
+        self.batcher = batcher
+        self.answer_cache = answer_cache
+        self.assembler = assembler or ContextAssembler()
+        self.answer_cache.set_corpus_version(rag.corpus_version)
+
+    def _retrieve_hits(self, query):
+        hits = self.batcher.retrieve(query)
+        retrieved = {
+            "query": query,
+            "results": [hit["text"] for hit in hits],
+            "chunk_ids": [hit["id"] for hit in hits],
+            "scores": [hit["score"] for hit in hits],
+        }
+        return retrieved, hits
+
+    def retrieve(self, query):
+        return self._retrieve_hits(query)[0]
+
+    def _prepare(self, query):
+        retrieved, hits = self._retrieve_hits(query)
+        with span("assemble_context") as attrs:
+            assembled = self.assembler.assemble(hits)
+            attrs["tokens"] = assembled.tokens
+        retrieved = {**retrieved, "citations": assembled.citations, "context_tokens": assembled.tokens}
+        query_emb = self.rag.answer_cache_embedding(query)
+        cached = self.answer_cache.get(query, query_emb, assembled.text, assembled.chunk_ids)
+        return retrieved, assembled, query_emb, cached
+
+    def answer(self, query):
+        retrieved, assembled, query_emb, cached = self._prepare(query)
+        stats = {}
+        if cached is None:
+            answer = answer_question(query, assembled.text, stats)
+            self.answer_cache.put(query, query_emb, assembled.text, assembled.chunk_ids, answer)
+        else:
+            answer = cached
+        return {**retrieved, "answer": answer, "cached": cached is not None, "stats": stats}
+
+    def stream(self, query):
+        """აბრუნებს მოვლენების გენერატორს: ჯერ მოძიებული ფრაგმენტები, შემდეგ პასუხის ნაწილები (delta), ბოლოს done."""
+        retrieved, assembled, query_emb, cached = self._prepare(query)
+        yield retrieved
+
+        stats = {}
+        if cached is not None:
+            yield {"delta": cached}
+        else:
+            parts = []
+            for delta in stream_answer(query, assembled.text, stats):
+                parts.append(delta)
+                yield {"delta": delta}
+            self.answer_cache.put(query, query_emb, assembled.text, assembled.chunk_ids, "".join(parts))
+        yield {"done": True, "cached": cached is not None, "stats": stats}
+
+
+class RAGRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Socket timeout: an idle keep-alive connection is closed instead of pinning a pool worker
+    timeout = KEEPALIVE_TIMEOUT
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, events):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for event in events:
+                self._write_chunk(event)
+        except Exception as e:
+            # Headers are already sent, so the failure is reported as the last event of the stream
+            print(f"❌ Streaming failed: {e}")
+            self._write_chunk({"error": str(e)})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, event):
+        data = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif path == "/metrics":
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        if path not in ("/retrieve", "/answer"):
+            self._send_json(404, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            query = body["query"].strip()
+            if not query:
+                raise ValueError("empty query")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._send_json(400, {"error": 'expected a JSON body like {"query": "..."}'})
+            return
+
+        service = self.server.service
+        with start_trace(f"http{path.replace('/', '.')}"):
+            try:
+                if path == "/retrieve":
+                    payload = service.retrieve(query)
+                elif body.get("stream"):
+                    events = service.stream(query)
+                    # Retrieval runs before the first event, so its errors still get a proper 500
+                    first_event = next(events)
+                else:
+                    payload = service.answer(query)
+            except Exception as e:
+                print(f"❌ Request to {path} failed: {e}")
+                self._send_json(500, {"error": str(e)})
+                return
+
+            if path == "/answer" and body.get("stream"):
+                self._send_stream(itertools.chain([first_event], events))
+            else:
+                self._send_json(200, payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledHTTPServer(ThreadingHTTPServer):
+    """
+    HTTP სერვერი, რომელიც მოთხოვნებს ამუშავებს max_workers ზომის თრედების ფიქსირებულ პულში და არა შეუზღუდავ თრედებში.
+    პულის რიგი შეზღუდულია max_queued კავშირით: სავსე რიგის დროს ახალი კავშირი მაშინვე იღებს 503-ს.
+    """
+
+    REJECT_BODY = json.dumps({"error": "server overloaded, retry later"}).encode("utf-8")
+
+    def __init__(self, address, handler_class, service, max_workers=8, max_queued=HTTP_MAX_QUEUED):
+        super().__init__(address, handler_class)
+        self.service = service
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http-worker")
+        self._capacity = threading.BoundedSemaphore(max_workers + max_queued)
+
+    def process_request(self, request, client_address):
+        if not self._capacity.acquire(blocking=False):
+            count("http_rejected")
+            self._reject(request)
+            return
+        self._pool.submit(self._process_and_release, request, client_address)
+
+    def _process_and_release(self, request, client_address):
+        try:
+            self.process_request_thread(request, client_address)
+        finally:
+            self._capacity.release()
+
+    def _reject(self, request):
+        try:
+            request.sendall(
+                b"HTTP/1.1 503 Service Unavailable\r\n"
+                b"Content-Type: application/json; charset=utf-8\r\n"
+                b"Retry-After: 1\r\n"
+                b"Connection: close\r\n"
+                + f"Content-Length: {len(self.REJECT_BODY)}\r\n\r\n".encode("ascii")
+                + self.REJECT_BODY
+            )
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
+
+def build_rag(local_embeddings=False):
+    """
+    აგებს HybridRAG-ს ისევე, როგორც Streamlit აპლიკაცია: არსებობის შემთხვევაში ინდექსების ბანდლიდან (memmap), წინააღმდეგ შემთხვევაში
+    chunks.jsonl-დან. local_embeddings=True შემთხვევაში იყენებს HashingEmbeddingFunction-სა და დროებით Chroma-ს (ლოკალური დატვირთვის ტესტებისთვის).
+    """
+    if not local_embeddings:
+        embedding_model = GeminiEmbeddingFunction()
+        bundle = load_bundle(embedding_model.name())
+        if bundle is not None:
+            collection = open_vector_store(bundle.chunks, embedding_function=embedding_model,
+                                           full_vectors=bundle.reranker.matrix)
+            return HybridRAG(collection, bundle.chunks, embedding_model=embedding_model,
+                             sparse=bundle.sparse, reranker=bundle.reranker)
+        chunks = load_chunks()
+        return HybridRAG(open_vector_store(chunks, embedding_function=embedding_model), chunks,
+                         embedding_model=embedding_model)
+
+    chunks = load_chunks()
+
+    import chromadb
+    from core.local_embeddings import HashingEmbeddingFunction
+    embedding_model = HashingEmbeddingFunction()
+    collection = load_data(chunks, client=chromadb.EphemeralClient(), embedding_function=embedding_model)
+    return HybridRAG(collection, chunks, embedding_model=embedding_model, index_dir=tempfile.mkdtemp())
+
+
+def main():
+    """
+    HTTP სერვისის გაშვება პროექტის მთავარი დირექტორიიდან: python code/service.py --port 8000
+    POST /retrieve {"query": "..."} — მოძიებული ფრაგმენტები
+    POST /answer {"query": "...", "stream": true} — პასუხი (stream=true შემთხვევაში NDJSON სტრიმით)
+    GET /health, GET /metrics
+    """
+    parser = argparse.ArgumentParser(description="HTTP query service for the civil code RAG pipeline")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--max-queued", type=int, default=HTTP_MAX_QUEUED,
+                        help="connections waiting for a worker before new ones get 503")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--batch-wait-ms", type=float, default=5)
+    parser.add_argument("--local-embeddings", action="store_true",
+                        help="use the offline hashing embedding stand-in instead of Gemini")
+    args = parser.parse_args()
+
+    rag = build_rag(args.local_embeddings)
+    service = RAGService(rag, MicroBatcher(rag, args.batch_size, args.batch_wait_ms), AnswerCache())
+    server = PooledHTTPServer((args.host, args.port), RAGRequestHandler, service, max_workers=args.workers,
+                              max_queued=args.max_queued)
+    print(f"✅ RAG service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules import each other from code/, as when the scripts are run from the project root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
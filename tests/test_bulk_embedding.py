@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from google import genai
+from google.genai import types
+
+from core.bulk_embedding import BulkEmbedder, is_retryable
+from core.embedding_cache import EmbeddingCache
+from core.embeddings import GeminiEmbeddingFunction
+
+
+class FakeGeminiEndpoint:
+    """
+    Local stand-in for the Gemini batchEmbedContents endpoint. Each request takes the next scripted reply:
+    an HTTP status (429, 503, ...), "timeout" (answers after the client's timeout) or 200 with one vector per text.
+    """
+
+    def __init__(self, script=()):
+        self.script = list(script)
+        self.requests = []
+        self._lock = threading.Lock()
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                texts = [request["content"]["parts"][0]["text"] for request in body["requests"]]
+                with endpoint._lock:
+                    endpoint.requests.append(texts)
+                    reply = endpoint.script.pop(0) if endpoint.script else 200
+                if reply == "timeout":
+                    time.sleep(1.0)
+                    reply = 200
+                if reply == 200:
+                    payload = {"embeddings": [{"values": [float(len(text)), 1.0]} for text in texts]}
+                else:
+                    status = {429: "RESOURCE_EXHAUSTED", 503: "UNAVAILABLE"}.get(reply, "INVALID_ARGUMENT")
+                    payload = {"error": {"code": reply, "message": "scripted failure", "status": status}}
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(reply)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def client(self):
+        return genai.Client(api_key="test", http_options=types.HttpOptions(
+            base_url=f"http://127.0.0.1:{self.server.server_port}", timeout=300,
+        ))
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def endpoint():
+    fake = FakeGeminiEndpoint()
+    yield fake
+    fake.close()
+
+
+def make_embedder(endpoint, **kwargs):
+    function = GeminiEmbeddingFunction(batch_size=2, cache=EmbeddingCache(path=None), client=endpoint.client())
+    sleeps = []
+    embedder = BulkEmbedder(function, concurrency=1, requests_per_minute=0, tokens_per_minute=0,
+                            sleep=sleeps.append, **kwargs)
+    return embedder, sleeps
+
+
+def test_retries_quota_and_unavailable_responses(endpoint):
+    endpoint.script = [429, 503, 200]
+    embedder, sleeps = make_embedder(endpoint, max_retries=3)
+
+    vectors = embedder.embed(["ab", "abc"])
+
+    assert vectors == [[2.0, 1.0], [3.0, 1.0]]
+    assert len(endpoint.requests) == 3
+    assert len(sleeps) == 2
+    assert embedder.last_report["retries"] == 2
+
+
+def test_retries_transport_timeouts(endpoint):
+    endpoint.script = ["timeout", 200]
+    embedder, sleeps = make_embedder(endpoint, max_retries=2)
+
+    assert embedder.embed(["abcd"]) == [[4.0, 1.0]]
+    assert embedder.last_report["retries"] == 1
+
+
+def test_does_not_retry_bad_requests(endpoint):
+    endpoint.script = [400]
+    embedder, sleeps = make_embedder(endpoint, max_retries=3)
+
+    with pytest.raises(Exception):
+        embedder.embed(["a"])
+    assert len(endpoint.requests) == 1
+    assert sleeps == []
+
+
+def test_completed_batches_are_checkpointed_before_a_failure(endpoint):
+    # First batch succeeds, the second keeps failing with 503 until retries run out
+    endpoint.script = [200, 503, 503]
+    embedder, _ = make_embedder(endpoint, max_retries=1)
+
+    with pytest.raises(Exception):
+        embedder.embed(["a", "b", "c", "d"])
+
+    endpoint.script = []
+    assert embedder.embed(["a", "b", "c", "d"]) == [[1.0, 1.0]] * 4
+    # The rerun only sends the batch that failed
+    assert endpoint.requests[-1] == ["c", "d"]
+    assert embedder.last_report["cached"] == 2
+
+
+@pytest.mark.parametrize("error, expected", [
+    (httpx.ReadTimeout("read timed out"), True),
+    (httpx.ConnectError("connection refused"), True),
+    (httpx.RemoteProtocolError("server disconnected"), True),
+    (httpx.UnsupportedProtocol("unknown scheme"), False),
+    (TimeoutError(), True),
+    (ValueError("chunk 429 of 500 is too long"), False),
+    (RuntimeError("HTTP 503 Service Unavailable"), True),
+])
+def test_is_retryable(error, expected):
+    assert is_retryable(error) is expected
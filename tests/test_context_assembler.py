@@ -0,0 +1,36 @@
+from core.bulk_embedding import EMBED_CHARS_PER_TOKEN
+from rag_pipeline.context_assembler import ContextAssembler
+
+
+def _hit(article, seq, body, score):
+    return {
+        "id": f"art_{article}_{seq}",
+        "text": f"მუხლი {article}. სათაური\n{body}",
+        "score": score,
+        "metadata": {"article_number": article, "article_title": "სათაური", "sub_chunk_seq": seq},
+    }
+
+
+def test_explicit_zero_budget_is_respected(monkeypatch):
+    monkeypatch.setenv("CONTEXT_TOKEN_BUDGET", "3000")
+    assembler = ContextAssembler(token_budget=0)
+    assert assembler.token_budget == 0
+    context = assembler.assemble([_hit("1", 0, "ტექსტი " * 50, 1.0)])
+    assert context.text == ""
+    assert context.chunk_ids == []
+
+
+def test_defaults_come_from_environment_and_ingestion_estimate(monkeypatch):
+    monkeypatch.setenv("CONTEXT_TOKEN_BUDGET", "123")
+    monkeypatch.delenv("CONTEXT_CHARS_PER_TOKEN", raising=False)
+    assembler = ContextAssembler()
+    assert assembler.token_budget == 123
+    assert assembler.chars_per_token == EMBED_CHARS_PER_TOKEN
+
+
+def test_small_budget_still_sends_truncated_best_part():
+    assembler = ContextAssembler(token_budget=10, chars_per_token=1)
+    context = assembler.assemble([_hit("1", 0, "ა" * 100, 0.5), _hit("2", 0, "ბ" * 100, 0.9)])
+    assert context.chunk_ids == ["art_2_0"]
+    assert context.text.startswith("მუხლი 2.")
+    assert "ბ" * 100 not in context.text
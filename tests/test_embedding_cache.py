@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from core.embedding_cache import EmbeddingCache
+from core.embeddings import GeminiEmbeddingFunction
+
+
+class FakeEmbedClient:
+    """Stand-in for genai.Client: embed_content returns [len(text), 1.0] and records every batch it was sent."""
+
+    def __init__(self):
+        self.batches = []
+        self.models = self
+
+    def embed_content(self, model, contents, config=None):
+        self.batches.append(list(contents))
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=[float(len(text)), 1.0]) for text in contents])
+
+
+def test_get_many_counts_memory_disk_hits_and_misses(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path)
+    cache.put_many({"a": [0.1, 0.2], "b": [0.3, 0.4]})
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "b"}
+    assert cache.stats()["memory_hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+    # A new process only has the disk tier; a disk hit is promoted to memory
+    reopened = EmbeddingCache(path)
+    assert set(reopened.get_many(["a"])) == {"a"}
+    assert set(reopened.get_many(["a"])) == {"a"}
+    stats = reopened.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+
+
+def test_memory_and_disk_tiers_return_the_same_float32_vector(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    vector = [0.1, 0.2, 1 / 3]
+    EmbeddingCache(path).put_many({"k": vector})
+    cache = EmbeddingCache(path)
+    cache.put_many({"k": vector})
+
+    from_memory = cache.get_many(["k"])["k"]
+    from_disk = EmbeddingCache(path).get_many(["k"])["k"]
+    assert from_memory == from_disk == np.asarray(vector, dtype=np.float32).tolist()
+
+
+def test_memory_tier_is_lru_bounded():
+    cache = EmbeddingCache(path=None, max_memory_entries=2)
+    cache.put_many({"a": [1.0], "b": [2.0]})
+    cache.get_many(["a"])  # "a" becomes the most recently used entry
+    cache.put_many({"c": [3.0]})
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_memory_entries=0, max_disk_entries=2)
+    cache.put_many({"a": [1.0]})
+    cache.put_many({"b": [2.0]})
+    cache.put_many({"c": [3.0]})
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"b", "c"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_embed_sends_only_unique_cache_misses():
+    client = FakeEmbedClient()
+    function = GeminiEmbeddingFunction(batch_size=2, cache=EmbeddingCache(path=None), client=client)
+
+    first = function(["aa", "b", "aa", "ccc"])
+    assert first == [[2.0, 1.0], [1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+    # Duplicates are embedded once, in batch_size batches
+    assert client.batches == [["aa", "b"], ["ccc"]]
+
+    second = function(["ccc", "dddd", "b"])
+    assert second == [[3.0, 1.0], [4.0, 1.0], [1.0, 1.0]]
+    assert client.batches[-1] == ["dddd"]
+    stats = function.cache_stats()
+    assert stats["misses"] == 4
+    assert stats["memory_hits"] == 2
+
+
+def test_cache_keys_separate_models_and_task_types():
+    cache = EmbeddingCache(path=None)
+    keys = {
+        cache.make_key("m1", "RETRIEVAL_QUERY", "text"),
+        cache.make_key("m2", "RETRIEVAL_QUERY", "text"),
+        cache.make_key("m1", "RETRIEVAL_DOCUMENT", "text"),
+    }
+    assert len(keys) == 3
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+
+from processing.data_processing import save_chunks
+from rag_pipeline.index_bundle import build_bundle, load_bundle
+
+
+class FakeEmbedder:
+    """Deterministic stand-in for GeminiEmbeddingFunction: no collection, so every chunk is embedded."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def name(self):
+        return "fake-embedder"
+
+    def __call__(self, texts):
+        self.calls += 1
+        return [np.array([len(text), 1.0, text.count("ა")], dtype=np.float32) for text in texts]
+
+
+def _chunks(*texts):
+    return [
+        {"id": f"art_{i}", "text": text, "metadata": {"article_number": str(i), "article_title": f"მუხლი {i}"}}
+        for i, text in enumerate(texts, start=1)
+    ]
+
+
+def _build(tmp_path, chunks):
+    chunks_path = str(tmp_path / "chunks.jsonl")
+    bundle_dir = str(tmp_path / "bundle")
+    save_chunks(chunks, chunks_path)
+    build_bundle(chunks, None, FakeEmbedder(), bundle_dir=bundle_dir, chunks_path=chunks_path)
+    return bundle_dir, chunks_path
+
+
+def test_load_returns_plain_chunks_and_working_indexes(tmp_path):
+    chunks = _chunks("მუხლი 1. ხელშეკრულება იდება წერილობით", "მუხლი 2. მემკვიდრეობა იხსნება სიკვდილით")
+    bundle_dir, chunks_path = _build(tmp_path, chunks)
+
+    bundle = load_bundle("fake-embedder", bundle_dir=bundle_dir, chunks_path=chunks_path)
+
+    assert bundle is not None
+    assert bundle.chunks == chunks
+    assert all(type(chunk) is dict for chunk in bundle.chunks)
+    assert bundle.sparse.documents == [chunk["text"] for chunk in chunks]
+    assert bundle.reranker.matrix.shape == (2, 3)
+
+
+def test_other_embedding_model_is_ignored(tmp_path):
+    bundle_dir, chunks_path = _build(tmp_path, _chunks("ერთი", "ორი"))
+    assert load_bundle("other-model", bundle_dir=bundle_dir, chunks_path=chunks_path) is None
+
+
+def test_touched_but_identical_chunks_file_is_accepted(tmp_path):
+    chunks = _chunks("ერთი", "ორი")
+    bundle_dir, chunks_path = _build(tmp_path, chunks)
+    # Same content, new mtime: the signature misses and the fingerprint is recomputed
+    save_chunks(chunks, chunks_path)
+    stat = os.stat(chunks_path)
+    os.utime(chunks_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert load_bundle("fake-embedder", bundle_dir=bundle_dir, chunks_path=chunks_path) is not None
+
+
+def test_bundle_from_other_chunks_is_ignored(tmp_path):
+    bundle_dir, chunks_path = _build(tmp_path, _chunks("ერთი", "ორი"))
+    # Ingestion rewrote chunks.jsonl but stopped before rebuilding the bundle
+    save_chunks(_chunks("ერთი", "სამი"), chunks_path)
+    stat = os.stat(chunks_path)
+    os.utime(chunks_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert load_bundle("fake-embedder", bundle_dir=bundle_dir, chunks_path=chunks_path) is None
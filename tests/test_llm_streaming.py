@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from rag_pipeline.llm import stream_answer
+
+
+class FakeStreamClient:
+    """Stand-in for genai.Client whose generate_content_stream yields scripted chunks."""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.calls = 0
+        self.models = self
+
+    def generate_content_stream(self, model, contents):
+        self.calls += 1
+        usage = SimpleNamespace(prompt_token_count=100, candidates_token_count=7, total_token_count=107)
+        for i, text in enumerate(self.parts):
+            last = i == len(self.parts) - 1
+            yield SimpleNamespace(text=text, usage_metadata=usage if last else None)
+
+
+def test_stream_answer_yields_deltas_and_records_stats():
+    client = FakeStreamClient(["პასუ", "", "ხი"])
+    stats = {}
+
+    parts = list(stream_answer("კითხვა streaming-stats", "კონტექსტი", stats, client=client))
+
+    assert parts == ["პასუ", "ხი"]
+    assert client.calls == 1
+    assert 0 <= stats["time_to_first_token"] <= stats["total_time"]
+    assert (stats["prompt_tokens"], stats["output_tokens"], stats["total_tokens"]) == (100, 7, 107)
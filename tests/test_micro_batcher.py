@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from rag_pipeline.micro_batcher import MicroBatcher
+
+
+class FakeRAG:
+    """Stand-in for HybridRAG: retrieve_many_hits echoes each query and records the batches it received."""
+
+    def __init__(self, delay=0.0, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.batches = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def retrieve_many_hits(self, queries):
+        with self._lock:
+            self.batches.append(list(queries))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if self.fail_on is not None and self.fail_on in queries:
+                raise RuntimeError(f"backend failed on {self.fail_on}")
+            return [[{"id": query, "text": query.upper()}] for query in queries]
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_concurrent_queries_are_merged_and_results_fanned_out():
+    rag = FakeRAG()
+    batcher = MicroBatcher(rag, max_batch_size=32, max_wait_ms=50)
+    queries = [f"q{i}" for i in range(8)]
+
+    with ThreadPoolExecutor(len(queries)) as pool:
+        results = list(pool.map(batcher.retrieve, queries))
+
+    assert results == [[{"id": query, "text": query.upper()}] for query in queries]
+    assert len(rag.batches) < len(queries)
+    assert sorted(query for batch in rag.batches for query in batch) == sorted(queries)
+
+
+def test_batches_are_split_at_max_batch_size():
+    rag = FakeRAG()
+    batcher = MicroBatcher(rag, max_batch_size=3, max_wait_ms=50)
+
+    futures = [batcher.submit(f"q{i}") for i in range(7)]
+
+    assert [future.result(timeout=5) for future in futures] == [[{"id": f"q{i}", "text": f"Q{i}"}] for i in range(7)]
+    assert all(len(batch) <= 3 for batch in rag.batches)
+
+
+def test_identical_pending_queries_share_one_future():
+    rag = FakeRAG(delay=0.1)
+    batcher = MicroBatcher(rag, max_batch_size=32, max_wait_ms=20)
+
+    first = batcher.submit("same")
+    second = batcher.submit("same")
+
+    assert first is second
+    assert first.result(timeout=5) == [{"id": "same", "text": "SAME"}]
+    assert sum(batch.count("same") for batch in rag.batches) == 1
+
+
+def test_errors_reach_every_query_of_the_failed_batch_only():
+    rag = FakeRAG(fail_on="bad")
+    batcher = MicroBatcher(rag, max_batch_size=32, max_wait_ms=50)
+
+    failed = [batcher.submit(query) for query in ("bad", "also-in-batch")]
+    for future in failed:
+        with pytest.raises(RuntimeError, match="bad"):
+            future.result(timeout=5)
+
+    # The failed query is no longer pending, so a retry is a fresh submission
+    assert batcher.retrieve("also-in-batch", timeout=5) == [{"id": "also-in-batch", "text": "ALSO-IN-BATCH"}]
+
+
+def test_slow_batches_do_not_block_the_next_ones():
+    rag = FakeRAG(delay=0.3)
+    batcher = MicroBatcher(rag, max_batch_size=1, max_wait_ms=1, max_in_flight=4)
+
+    started = time.perf_counter()
+    futures = [batcher.submit(f"q{i}") for i in range(4)]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert rag.peak > 1
+    assert time.perf_counter() - started < 1.0